@@ -1,3 +1,13 @@
-from .ascii_tree import print_tree
-from .external import transformed_tree, make_and_print_tree, update_param
+from .ascii_tree import print_tree, iter_lines, render_to_string, render_to_bytes
+from .compact import CompactTree
+from .custom_types import box_cache_info, clear_box_cache
+from .incremental import IncrementalLayout
+from .live import LiveRenderer
+from .stats import RenderStats
+from .cache import RenderCache
+from .paged import PagedTree
+from .viewport import Viewport
+from .saved import SavedLayout
+from .aio import aiter_lines, render_tree_async, transformed_tree_async
+from .external import transformed_tree, make_and_print_tree, update_param, expand
 
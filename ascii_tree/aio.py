@@ -0,0 +1,124 @@
+'''
+asyncio interface, for rendering trees inside services
+without blocking the event loop.
+
+Rendering is CPU bound, so it can't run concurrently with other
+coroutines; instead, lines are produced in batches and control
+is returned to the event loop between batches. Layout, which must
+finish before the first line, can be run in an executor.
+'''
+import asyncio
+import inspect
+from functools import partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Union
+from . import charsets
+from .params import SCREEN_WIDTH, SCREEN_HEIGHT, LAYOUT, MARGIN, PADDING, ASYNC_BATCH_LINES
+from .ascii_tree import iter_lines, iter_page_lines, layout_pages
+from .custom_types import Node
+from .external import _box_params
+from .stats import RenderStats
+
+
+async def aiter_lines(root, screen_width: int=SCREEN_WIDTH, margin: int=MARGIN, padding: int=PADDING,
+                      charset=charsets.Unicode, stats: RenderStats=None, screen_height: int=SCREEN_HEIGHT,
+                      layout: str=LAYOUT, offload: bool=False, executor=None,
+                      batch_lines: int=ASYNC_BATCH_LINES)->AsyncIterator[str]:
+    '''
+    yield the lines of `iter_lines`, returning control to the
+    event loop after every `batch_lines` lines.
+    If `offload` is true, or an `executor` is given, layout (i.e.
+    `get_node_widths` and `split_tree`) runs in `executor`, the loop's
+    default executor if None, while the loop runs other tasks.
+    The tree must not be modified while it's being rendered.
+    '''
+    if layout == 'indented':
+        lines = iter_lines(root, charset=charset, stats=stats, layout=layout)
+    else:
+        layout_args = (root, screen_width, margin, stats, screen_height, layout)
+        if offload or executor is not None:
+            loop = asyncio.get_running_loop()
+            pages = await loop.run_in_executor(executor, partial(layout_pages, *layout_args, padding=padding))
+        else:
+            pages = layout_pages(*layout_args, padding=padding)
+        lines = iter_page_lines(pages, screen_width, padding, charset, stats=stats)
+
+    count = 0
+    for line in lines:
+        yield line
+        count += 1
+        if count == batch_lines:
+            count = 0
+            await asyncio.sleep(0)
+
+
+async def render_tree_async(root, screen_width: int=SCREEN_WIDTH, margin: int=MARGIN, padding: int=PADDING,
+                            charset=charsets.Unicode, stats: RenderStats=None,
+                            screen_height: int=SCREEN_HEIGHT, layout: str=LAYOUT, offload: bool=False,
+                            executor=None)->str:
+    '''
+    return output of `print_tree` as a string; see `aiter_lines`
+    '''
+    lines = [line async for line in aiter_lines(root, screen_width, margin, padding, charset, stats,
+                                                screen_height, layout, offload, executor)]
+    lines.append('')
+    return '\n'.join(lines)
+
+
+async def transformed_tree_async(root: Any, get_val: Callable[[Any], Union[Any, Awaitable]],
+                                 get_children: Callable[[Any], Union[Iterable, Awaitable]],
+                                 concurrency: int=None)->Node:
+    '''
+    like `external.transformed_tree`, for source trees whose
+    children are fetched asynchronously, e.g. over the network.
+    `get_val` and `get_children` may be plain or async callables; `get_children`
+    may also return an async iterable. The children of all nodes of a
+    level are fetched concurrently, at most `concurrency` at a time if given.
+    Children are in the same order as with `transformed_tree`.
+    '''
+    limit = None if concurrency is None else asyncio.Semaphore(concurrency)
+    troot = Node.init_with_box(await _call(get_val, root, limit), **_box_params)
+    level = [(root, troot)]
+    while level:
+        child_lists = await asyncio.gather(*(_call(get_children, source, limit) for source, _ in level))
+        sources = []
+        parents = []
+        for (_, tnode), children in zip(level, child_lists):
+            for child in children:
+                sources.append(child)
+                parents.append(tnode)
+        vals = [get_val(child) for child in sources]
+        pending = [idx for idx, val in enumerate(vals) if inspect.isawaitable(val)]
+        if pending:
+            resolved = await asyncio.gather(*(_bounded(vals[idx], limit) for idx in pending))
+            for idx, val in zip(pending, resolved):
+                vals[idx] = val
+
+        level = []
+        for child, tnode, val in zip(sources, parents, vals):
+            tchild = Node.init_with_box(val, **_box_params)
+            tnode.children.append(tchild)
+            level.append((child, tchild))
+    return troot
+
+
+async def _call(func: Callable, arg: Any, limit: asyncio.Semaphore):
+    '''
+    return func(arg), awaiting it if it's awaitable
+    and collecting it if it's an async iterable
+    '''
+    result = func(arg)
+    if inspect.isawaitable(result):
+        result = await _bounded(result, limit)
+    if hasattr(result, '__aiter__'):
+        if limit is None:
+            return [item async for item in result]
+        async with limit:
+            return [item async for item in result]
+    return result
+
+
+async def _bounded(awaitable: Awaitable, limit: asyncio.Semaphore):
+    if limit is None:
+        return await awaitable
+    async with limit:
+        return await awaitable
@@ -4,13 +4,24 @@ onto page or possibly onto multiple pages if it's too
 big to fit on a single page.
 '''
 
+import io
 import math
-from copy import copy
-from typing import List, Callable
+import sys
+from functools import partial
+from itertools import islice
+from typing import Iterable, Iterator, List, Callable
 from . import charsets
-from .params import SCREEN_WIDTH, MARGIN, PADDING, SHOW_CONT_DIALOG
-from .custom_types import Node, Offset, AsciiBox
-from .draw import draw, draw_line
+from .params import SCREEN_WIDTH, SCREEN_HEIGHT, LAYOUT, CANVAS, MARGIN, PADDING, SHOW_CONT_DIALOG, \
+    WRITE_CHUNK_LINES
+from .custom_types import Node, Offset, AsciiBox, PageNode, ContNode, SharedRoot, box_dims
+from .compact import CompactTree
+from .draw import draw, draw_boxes, draw_line, flatten, iter_rows, page_height, page_width
+from .parallel import render_pages
+from .stats import RenderStats, phase
+from .cache import RenderCache, tree_key
+from .indented import iter_indented
+from .tidy import tidy_layout
+from . import numpy_canvas
 
 
 def get_margin(node_count: int, margin: int=MARGIN)->float:
@@ -43,6 +54,21 @@ def recomp_node_width(root: Node, add_on: Node=None, margin: int=MARGIN)->int:
     return total_width
 
 
+def preorder(root: Node)->List[Node]:
+    '''
+    list nodes of tree rooted at `root` in pre-order.
+    uses an explicit stack so arbitrarily deep trees
+    don't hit the recursion limit
+    '''
+    order = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        stack.extend(reversed(node.children))
+    return order
+
+
 def get_node_widths(root: Node, margin: int=MARGIN):
     '''
     - compute width of each node
@@ -56,18 +82,18 @@ def get_node_widths(root: Node, margin: int=MARGIN):
     Returns:
         dict: map of width of each node.
     '''
-    total_width = 0
-    if root.is_leaf:
-        total_width = root.box.width
-    else:
-        for child in root.children:
-          total_width += get_node_widths(child, margin)
-        # n children need n-1 spaces between them
-        total_width += get_margin(len(root.children), margin)
-        # in case parent is wider than all children
-        total_width = max(total_width, root.box.width)
-    root.box.tree_width = total_width
-    return total_width
+    # reversed pre-order visits every child before its parent
+    for node in reversed(preorder(root)):
+        if node.is_leaf:
+            total_width = node.box.width
+        else:
+            total_width = sum(child.box.tree_width for child in node.children)
+            # n children need n-1 spaces between them
+            total_width += get_margin(len(node.children), margin)
+            # in case parent is wider than all children
+            total_width = max(total_width, node.box.width)
+        node.box.tree_width = total_width
+    return root.box.tree_width
 
 
 def get_tree_height(root: Node, margin: int=MARGIN)->int:
@@ -94,32 +120,35 @@ def position_nodes(root: Node, left_offset: int, top_offset: int, margin: int=MA
                     for root this is 0
         top_offset
     '''
-    if root.is_leaf:
-        root.box.position = Offset(left_offset, top_offset)
-    else:
-        # compute positions for children
-        # compute offsets for children
-        child_top_offset = top_offset + root.box.box_height + margin
-        for i, child in enumerate(root.children):
-            if i == 0:
-                child_left_offset = left_offset
-            else:
-                prev_child = root.children[i-1]
-                # using the offset of previous sibling is wrong since
-                # if the sibling has children, the sibling will be positioned
-                # in the middle of its children and its offset will shifted to right
-                # want the left offset of the leftmost descendent of the prev
-                # sibling. This can be achieved by directly storing that value
-                child_left_offset = prev_child.box.tree_left_offset + margin + prev_child.box.tree_width
-            position_nodes(child, child_left_offset, child_top_offset, margin)
-        # compute self positions
-        # place between first and last child
-        first = root.children[0].box.position.left
-        last = root.children[-1].box.position.left
-        node_left_offset = left_offset + (last - first) // 2
-        root.box.position = Offset(node_left_offset, top_offset)
-    # store the left-offset of the space for the box and it's descendents
-    root.box.tree_left_offset = left_offset
+    # pre-order pass: the left-offset of the space for a box and it's
+    # descendents only depends on the offsets and widths of the
+    # ancestors and previous siblings
+    placed = []
+    stack = [(root, left_offset, top_offset)]
+    while stack:
+        node, left, top = stack.pop()
+        node.box.tree_left_offset = left
+        placed.append((node, left, top))
+        child_top_offset = top + node.box.box_height + margin
+        child_offsets = []
+        for child in node.children:
+            child_offsets.append((child, left, child_top_offset))
+            # using the offset of previous sibling is wrong since
+            # if the sibling has children, the sibling will be positioned
+            # in the middle of its children and its offset will shifted to right
+            # want the left offset of the leftmost descendent of the prev
+            # sibling, i.e. its tree_left_offset
+            left += child.box.tree_width + margin
+        stack.extend(reversed(child_offsets))
+
+    # post-order pass: a parent is placed between its first and last child
+    for node, left, top in reversed(placed):
+        if node.is_leaf:
+            node.box.position = Offset(left, top)
+        else:
+            first = node.children[0].box.position.left
+            last = node.children[-1].box.position.left
+            node.box.position = Offset(left + (last - first) // 2, top)
     return root.box.position
 
 
@@ -130,11 +159,22 @@ def update_page_nums(page_map: dict, splits: List[Node]):
     for i, split in enumerate(splits):
         if split in page_map:
             # relies on template string value
-            page_map[split].val = page_map[split].val.format(str(i))
+            msg_node = page_map[split]
+            val = msg_node.val.format(str(i))
+            if len(val) > msg_node.box.line_width:
+                # the box was sized for a 2 digit page number, with trailing
+                # spaces to spare; give them up for longer page numbers
+                val = val.rstrip()
+            if len(val) > msg_node.box.line_width:
+                # from page 10000 on, the number doesn't fit on the line;
+                # widen the box into the margin to its right, as its
+                # position and the space laid out for it are kept
+                msg_node.box_width, msg_node.line_width, _, _ = box_dims(val)
+            msg_node.val = val
 
 
 def split_tree(root: Node, max_width: int=SCREEN_WIDTH, first_max_width: int=None,
-               margin: int=MARGIN, show_page: bool=SHOW_CONT_DIALOG):
+               margin: int=MARGIN, show_page: bool=SHOW_CONT_DIALOG, layout_page: Callable=None):
     '''
     split a tree that is too wide/tall.
     allows specifying a different first_max_width, e.g.
@@ -150,31 +190,66 @@ def split_tree(root: Node, max_width: int=SCREEN_WIDTH, first_max_width: int=Non
         - if tree gets too wide, split root
         - if child is too wide, iteratively split child
         - track page number
-    NB: typically have to fully copy a root at a split since
-    location and width info is stored directly on the objects.
+    Nodes that are split are not copied; each page has a `PageNode`
+    view of them, which refers to the node and only holds the layout
+    on that page. Subtrees that aren't split are laid out in place.
+    Assumes widths are computed, i.e. `get_node_widths`.
+    Returns page roots, and a map of page roots to the `ContNode`
+    referencing them. Pages are positioned with `position_nodes`, or laid
+    out with `layout_page(page, margin)` if given, e.g. `tidy_layout`.
+
+    Each level is split by a `_split_level` generator; child levels
+    are driven from an explicit stack rather than recursion,
+    so deep trees don't hit the recursion limit.
 
     TODO: implement turning off cont. on ... dialog
     '''
+    levels = [_split_level(root, max_width, first_max_width, margin)]
+    result = None
+    while levels:
+        try:
+            child, child_max_width = levels[-1].send(result)
+        except StopIteration as done:
+            # level is split; resume its parent with the result
+            levels.pop()
+            result = done.value
+        else:
+            levels.append(_split_level(child, max_width, child_max_width, margin))
+            result = None
+
+    # widths are computed while splitting; each page is positioned once
+    splits, page_map = result
+    for sroot in splits:
+        if layout_page is None:
+            position_nodes(sroot, 0, 0, margin)
+        else:
+            layout_page(sroot, margin)
+    return splits, page_map
+
+
+def _split_level(root: Node, max_width: int, first_max_width: int, margin: int):
+    '''
+    split the children of `root`; see `split_tree`.
+    yields (child, first_max_width) for each child that needs
+    to be split and expects to be sent back (splits, page_map)
+    of that child. Returns (splits, page_map) of root.
+    '''
     if first_max_width is None:
         first_max_width = max_width
 
-    # a child call will update a clone
-    # we may want to update actual, especially when slicing the tree
-    sroot = copy(root)
+    # view of root on current page
+    sroot = PageNode(root)
     splits = []
     child_splits = []  # inserted after splits on current level
-    # leave space for 3 digit page numbers
-    msg_node = Node.init_with_box('Cont. on page {}  ')
-    msg_node_copy = None
     # maximum width a single child can consume
-    max_child_width = max_width - margin - msg_node.box.width
+    max_child_width = max_width - margin - ContNode.width
     # map root to msg_node
     page_map = {}
+    children_width = 0
     for i, child in enumerate(root.children):
         if child.box.tree_width > max_child_width:
-            # recursively split child
-            csplits, cpage_map = split_tree(child, max_width=max_width, first_max_width=max_child_width,
-                                            margin=margin, show_page=show_page)
+            # split child
+            csplits, cpage_map = yield child, max_child_width
             # will get attached to sroot
             child = csplits[0]  # partitioned child
             # keep separated so these splits can be inserted after siblings
@@ -182,11 +257,16 @@ def split_tree(root: Node, max_width: int=SCREEN_WIDTH, first_max_width: int=Non
             page_map.update(cpage_map)
 
         sroot.children.append(child)
-        is_last_child = i == len(root.children) - 1
-        if is_last_child:
-            new_width = recomp_node_width(sroot, margin=margin)
+        # running total of children widths, so the width
+        # of sroot is computed in constant time
+        new_children_width = children_width + child.box.tree_width
+        if i == len(root.children) - 1:
+            new_width = new_children_width + get_margin(len(sroot.children), margin)
         else:
-            new_width = recomp_node_width(sroot, add_on=msg_node, margin=margin)
+            # leave space for msg node
+            new_width = new_children_width + get_margin(len(sroot.children) + 1, margin) + \
+                ContNode.width
+        new_width = max(new_width, sroot.box.width)
 
         # handle different first_max_width and max_width
         if i == 0:
@@ -196,54 +276,363 @@ def split_tree(root: Node, max_width: int=SCREEN_WIDTH, first_max_width: int=Non
 
         if new_width > alloc_width:
             sroot.children.pop()
-            msg_node_copy = copy(msg_node)
-            sroot.children.append(msg_node_copy)
-            # recompute widths
-            get_node_widths(sroot, margin)
-            position_nodes(sroot, 0, 0, margin)
+            msg_node = ContNode()
+            sroot.children.append(msg_node)
+            sroot.tree_width = max(children_width + msg_node.tree_width +
+                                   get_margin(len(sroot.children), margin), sroot.width)
             splits.append(sroot)
             # handle new childs
-            sroot = copy(sroot)
+            sroot = PageNode(root)
             sroot.children.append(child)
-            page_map[sroot] = msg_node_copy
+            page_map[sroot] = msg_node
+            new_children_width = child.box.tree_width
+        children_width = new_children_width
 
-    page_map[sroot] = msg_node_copy
-    get_node_widths(sroot)
-    position_nodes(sroot, 0, 0, margin)
+    if sroot.children:
+        sroot.tree_width = max(children_width + get_margin(len(sroot.children), margin), sroot.width)
+    else:
+        sroot.tree_width = sroot.width
     splits.append(sroot)
     splits.extend(child_splits)
     return splits, page_map
 
 
+def layout_page(root, margin: int=MARGIN)->int:
+    '''
+    compute widths and positions of nodes of a page
+    Returns width of page.
+    '''
+    get_node_widths(root, margin)
+    position_nodes(root, 0, 0, margin)
+    return root.box.tree_width
+
+
+def defer_position(unpositioned: set, root, margin: int=MARGIN):
+    '''
+    `layout_page` hook that leaves a page to be positioned later,
+    by adding it to `unpositioned`; see `layout_pages`
+    '''
+    unpositioned.add(root)
+
+
+def split_tall_pages(pages: list, page_map: dict, max_height: int, margin: int=MARGIN,
+                     layout_page: Callable=layout_page)->list:
+    '''
+    cut positioned pages that are taller than `max_height` into
+    continuation pages. Where a node's subtree reaches below the page,
+    its children are moved to a new page rooted at a `PageNode` view
+    of the node, and replaced by a `ContNode` on the current page;
+    see `split_tree`. Continuation pages follow the page they continue
+    and are cut in turn.
+    `page_map` is updated with the new pages. Cut pages are laid out
+    again with `layout_page(page, margin)`.
+    This is best-effort: a page is left taller than `max_height` if
+    a child of its root and a "Cont. on page" box below it don't fit.
+    Returns list of page roots.
+    '''
+    result = []
+    stack = list(reversed(pages))
+    while stack:
+        page = stack.pop()
+        page, cont_pages = _cut_page(page, max_height, margin, page_map, layout_page)
+        result.append(page)
+        stack.extend(reversed(cont_pages))
+    return result
+
+
+def _cut_page(root, max_height: int, margin: int, page_map: dict, layout_page: Callable)->tuple:
+    '''
+    cut a single page; see `split_tall_pages`.
+    Returns (root, continuation pages); root is replaced by
+    a `PageNode` if the page is cut.
+    '''
+    order = preorder(root)
+    # bottom row of subtree of each node
+    bottom = {}
+    for node in reversed(order):
+        node_bottom = node.box.position.top + node.box.box_height
+        for child in node.children:
+            node_bottom = max(node_bottom, bottom[child])
+        bottom[node] = node_bottom
+    if bottom[root] <= max_height:
+        return root, []
+
+    def cuttable(node):
+        # whether there's room for a ContNode under node
+        return not node.is_leaf and \
+            node.box.position.top + node.box.box_height + margin + ContNode.box_height <= max_height
+
+    # nodes whose children are moved to a continuation page, top-down
+    cuts = []
+    parent = {}
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        overflowing = []
+        for child in node.children:
+            parent[child] = node
+            if bottom[child] > max_height:
+                overflowing.append(child)
+        if not overflowing:
+            continue
+        if all(cuttable(child) for child in overflowing):
+            # cut further down
+            stack.extend(reversed(overflowing))
+        elif node is root:
+            # the root can't be cut since its continuation page would be
+            # the same page; cut its children instead, even where the
+            # "Cont. on page" box doesn't fit
+            for child in reversed(overflowing):
+                if cuttable(child):
+                    stack.append(child)
+                elif not child.is_leaf:
+                    cuts.append(child)
+        else:
+            cuts.append(node)
+    if not cuts:
+        return root, []
+
+    # cut nodes and their ancestors get views on this page, so the
+    # original nodes keep their children
+    views = {}
+
+    def own(node):
+        if isinstance(node, PageNode) or node in views:
+            return views.get(node, node)
+        view = views[node] = PageNode(node)
+        view.children = list(node.children)
+        if node in parent:
+            siblings = own(parent[node]).children
+            siblings[siblings.index(node)] = view
+        return view
+
+    cont_pages = []
+    for node in cuts:
+        cont_root = PageNode(node.node if isinstance(node, PageNode) else node)
+        cont_root.children = node.children if isinstance(node, PageNode) else list(node.children)
+        msg_node = ContNode()
+        own(node).children = [msg_node]
+        page_map[cont_root] = msg_node
+        layout_page(cont_root, margin)
+        cont_pages.append(cont_root)
+
+    root = own(root)
+    layout_page(root, margin)
+    return root, cont_pages
+
+
+def layout_pages(root, screen_width: int=SCREEN_WIDTH, margin: int=MARGIN, stats: RenderStats=None,
+                 screen_height: int=SCREEN_HEIGHT, layout: str=LAYOUT, unpositioned: set=None,
+                 padding: int=PADDING)->list:
+    '''
+    compute layout of root, splitting it into pages if it's
+    too wide, or if `screen_height` is set, too tall. `root` can be a `Node`,
+    a `CompactTree`, whose pages are laid out in its columns, through
+    `CompactNode` views of the nodes, or an object that maintains its own layout with
+    a `layout_pages(screen_width, margin, screen_height, layout, padding)`
+    method, e.g. `IncrementalLayout`, which raises ValueError for params
+    it doesn't support. `padding` is the padding pages are drawn with.
+    `layout` is 'boxed', or 'tidy' to nest subtrees closer together;
+    see `tidy.tidy_layout`. Only trees of `Node` and `CompactTree`s can be tidy.
+    Shared subtrees of a `SharedRoot` tree are laid out once; see `shared`.
+    If `unpositioned` is given, pages split by width aren't positioned where
+    that can be deferred, i.e. the boxed layout without `screen_height`;
+    they're added to it instead, and must be positioned with
+    `position_nodes(page, 0, 0, margin)` before they're drawn.
+    Returns list of page roots; all of them are positioned,
+    except those added to `unpositioned`.
+    '''
+    if layout not in ('boxed', 'tidy'):
+        raise ValueError(f'Unknown layout: {layout}')
+    tidy = layout == 'tidy'
+    if hasattr(root, 'layout_pages'):
+        with phase(stats, 'layout'):
+            return root.layout_pages(screen_width, margin, screen_height, layout, padding)
+    compact = isinstance(root, CompactTree)
+    if compact:
+        with phase(stats, 'layout'):
+            if not tidy and root.layout(margin) <= screen_width and \
+                    (screen_height is None or root.height() <= screen_height):
+                return [root]
+        # split and laid out in place, through views of the nodes;
+        # `layout` computed the widths and positions of the boxed layout
+        root = root.node()
+
+    if isinstance(root, SharedRoot):
+        # shared depends on this module
+        from .shared import prepare_shared
+        with phase(stats, 'widths'):
+            # pages of limited height are split at any depth
+            root = prepare_shared(root, margin, screen_width - margin - ContNode.width,
+                                  expand_all=tidy or screen_height is not None)
+
+    if tidy:
+        # computes positions, and the widths splitting is based on
+        with phase(stats, 'layout'):
+            tidy_layout(root, margin)
+    elif not compact:
+        with phase(stats, 'widths'):
+            get_node_widths(root, margin)
+    if root.box.tree_width <= screen_width:
+        if not tidy and not compact:
+            with phase(stats, 'position'):
+                position_nodes(root, 0, 0, margin)
+        pages, page_map = [root], {}
+    else:
+        # if tree is too wide, split the tree
+        if tidy:
+            split_layout = tidy_layout
+        elif unpositioned is not None and screen_height is None:
+            split_layout = partial(defer_position, unpositioned)
+        else:
+            split_layout = None
+        with phase(stats, 'split'):
+            pages, page_map = split_tree(root, max_width=screen_width, margin=margin, layout_page=split_layout)
+    if screen_height is not None:
+        with phase(stats, 'split'):
+            pages = split_tall_pages(pages, page_map, screen_height, margin,
+                                     tidy_layout if tidy else layout_page)
+    update_page_nums(page_map, pages)
+    return pages
+
+
+def flatten_page(page, stats: RenderStats=None)->tuple:
+    '''
+    flatten a positioned page into boxes and edges; see `draw.flatten`.
+    Pages with a `flatten` method, e.g. `CompactTree` and `saved.SavedPage`,
+    flatten themselves.
+    '''
+    with phase(stats, 'flatten'):
+        if hasattr(page, 'flatten'):
+            boxes, edges = page.flatten()
+        else:
+            boxes, edges = flatten(page)
+    if stats is not None:
+        stats.count_page(boxes, edges)
+    return boxes, edges
+
+
 def draw_tree(root, screen_width: int=SCREEN_WIDTH, margin: int=MARGIN, padding: int=PADDING,
-              charset=charsets.Unicode)->List[List[List[str]]]:
+              charset=charsets.Unicode, workers: int=1, stats: RenderStats=None,
+              screen_height: int=SCREEN_HEIGHT, layout: str=LAYOUT, canvas: str=CANVAS)->List[List[List[str]]]:
     '''
     Draw Ascii tree repr of root.
+    `root` can be anything accepted by `layout_pages`.
+    Pages are drawn on `workers` processes if it isn't 1 (all cores if None);
+    see `parallel.render_pages`.
+    Time per phase and counts are recorded in `stats`, if given.
+    Pages taller than `screen_height` are cut, if it's set; see `split_tall_pages`.
+    `layout` is 'boxed' or 'tidy'; see `layout_pages`.
+    `canvas` is 'list', or 'numpy' to draw pages serially with `numpy_canvas`.
     Return a list of screen objects with chunks of tree.
     '''
+    check_canvas(canvas)
+    pages = layout_pages(root, screen_width, margin, stats, screen_height, layout, padding=padding)
+    pages = [flatten_page(page, stats) for page in pages]
     screens = []
-    get_node_widths(root)
-    if root.box.tree_width <= screen_width:
-        # set screen height to be height of tree
-        screen_height = get_tree_height(root, margin)
-        # construct screen buffer
-        screen = [[' ']*screen_width for _ in range(screen_height)]
-        position_nodes(root, 0, 0, margin)
-        draw(screen, root, padding, charset)
-        screens.append(screen)
+    if canvas == 'numpy':
+        for boxes, edges in pages:
+            with phase(stats, 'draw'):
+                rows = numpy_canvas.render_rows(boxes, edges, screen_width, padding, charset)
+            with phase(stats, 'screen'):
+                width = max(screen_width, page_width(boxes))
+                screens.append([list(row.ljust(width)) for row in rows])
+    elif workers != 1:
+        with phase(stats, 'draw'):
+            page_rows = list(render_pages(pages, screen_width, padding, charset, workers))
+        with phase(stats, 'screen'):
+            for (boxes, _), rows in zip(pages, page_rows):
+                width = max(screen_width, page_width(boxes))
+                screens.append([list(row.ljust(width)) for row in rows])
     else:
-        # if tree is too wide, split the tree
-        splits, page_map = split_tree(root, max_width=screen_width, margin=margin)
-        update_page_nums(page_map, splits)
-        for sroot in splits:
-            screen_height = get_tree_height(sroot, margin)
-            screen = [[' ']*screen_width for _ in range(screen_height)]
-            draw(screen, sroot, padding, charset)
+        for boxes, edges in pages:
+            # construct screen buffer; screen height is height of tree.
+            # a box can stick out past the width the layout assumed
+            with phase(stats, 'screen'):
+                width = max(screen_width, page_width(boxes))
+                screen = [[' ']*width for _ in range(page_height(boxes))]
+            with phase(stats, 'draw'):
+                draw_boxes(screen, boxes, edges, padding, charset)
             screens.append(screen)
-
+    if stats is not None:
+        for screen in screens:
+            stats.count_screen(screen)
     return screens
 
 
+def check_canvas(canvas: str):
+    if canvas not in ('list', 'numpy'):
+        raise ValueError(f'Unknown canvas: {canvas}')
+
+
+def iter_lines(root, screen_width: int=SCREEN_WIDTH, margin: int=MARGIN, padding: int=PADDING,
+               charset=charsets.Unicode, workers: int=1, stats: RenderStats=None,
+               screen_height: int=SCREEN_HEIGHT, layout: str=LAYOUT, canvas: str=CANVAS)->Iterator[str]:
+    '''
+    Yield the lines of output of `print_tree`.
+    Rows are rendered top-down as they are consumed, so only a
+    band of rows of the current page is in memory at once.
+    If `workers` isn't 1, pages are instead rendered in parallel;
+    see `draw_tree`.
+    `layout` is 'boxed', 'tidy' (see `layout_pages`), or 'indented' for
+    a `tree` command like listing of a `Node` or `CompactTree` root, which is
+    streamed in a single pass; see `indented.iter_indented`. Width, height
+    and page params don't apply to the indented layout.
+    With `canvas='numpy'`, each page is drawn at once; see `draw_tree`.
+    '''
+    if layout == 'indented':
+        rows = iter_indented(root, charset=charset)
+        if stats is None:
+            yield from rows
+        else:
+            for row in stats.timed('draw', rows):
+                stats.count_row(row)
+                yield row
+        return
+
+    pages = layout_pages(root, screen_width, margin, stats, screen_height, layout, padding=padding)
+    yield from iter_page_lines(pages, screen_width, padding, charset, workers, stats, canvas)
+
+
+def iter_page_lines(pages: list, screen_width: int=SCREEN_WIDTH, padding: int=PADDING,
+                    charset=charsets.Unicode, workers: int=1, stats: RenderStats=None,
+                    canvas: str=CANVAS)->Iterator[str]:
+    '''
+    yield the lines of output of pages laid out by `layout_pages`,
+    with page headers and separators; see `iter_lines`
+    '''
+    check_canvas(canvas)
+    if canvas == 'numpy':
+        page_rows = _numpy_page_rows(pages, screen_width, padding, charset, stats)
+    elif workers == 1:
+        page_rows = (iter_rows(*flatten_page(page, stats), screen_width, padding=padding, charset=charset)
+                     for page in pages)
+    else:
+        page_rows = render_pages([flatten_page(page, stats) for page in pages], screen_width, padding,
+                                 charset, workers)
+        if stats is not None:
+            page_rows = stats.timed('draw', page_rows)
+    for i, rows in enumerate(page_rows):
+        yield 'page: {}'.format(i)
+        if stats is None:
+            yield from rows
+        else:
+            for row in stats.timed('draw', rows):
+                stats.count_row(row)
+                yield row
+        # page separator
+        if i != len(pages)-1:
+            yield draw_line(screen_width, charset)
+
+
+def _numpy_page_rows(pages: list, screen_width: int, padding: int, charset, stats: RenderStats):
+    for page in pages:
+        boxes, edges = flatten_page(page, stats)
+        with phase(stats, 'draw'):
+            rows = numpy_canvas.render_rows(boxes, edges, screen_width, padding, charset)
+        yield rows
+
+
 def print_screen(screen):
     '''
     print each row of the screen
@@ -252,15 +641,95 @@ def print_screen(screen):
         print(''.join(row).rstrip())
 
 
-def print_tree(root: Node, screen_width: int=SCREEN_WIDTH, margin: int=MARGIN, padding: int=PADDING,
-               charset=charsets.Unicode):
+def is_binary_stream(stream)->bool:
+    '''
+    whether `stream` accepts bytes rather than text
+    '''
+    if isinstance(stream, io.TextIOBase):
+        return False
+    return isinstance(stream, (io.RawIOBase, io.BufferedIOBase)) or 'b' in getattr(stream, 'mode', '')
+
+
+def write_lines(lines: Iterable[str], stream, encoding: str=None, chunk_lines: int=WRITE_CHUNK_LINES,
+                stats: RenderStats=None):
+    '''
+    write lines, each followed by a newline, to a text or binary stream.
+    Lines are joined into chunks of `chunk_lines` lines, so there is one
+    write per chunk. Text is encoded with `encoding` for binary streams,
+    utf-8 by default.
+    '''
+    binary = is_binary_stream(stream)
+    if binary:
+        encoding = encoding or 'utf-8'
+    elif stats is not None:
+        # for counting bytes
+        encoding = encoding or getattr(stream, 'encoding', None) or 'utf-8'
+    lines = iter(lines)
+    while True:
+        chunk = list(islice(lines, chunk_lines))
+        if not chunk:
+            break
+        text = '\n'.join(chunk) + '\n'
+        with phase(stats, 'write'):
+            if binary:
+                text = text.encode(encoding)
+            stream.write(text)
+        if stats is not None:
+            stats.count_written(len(chunk), len(text) if binary else len(text.encode(encoding)))
+
+
+def print_tree(root, screen_width: int=SCREEN_WIDTH, margin: int=MARGIN, padding: int=PADDING,
+               charset=charsets.Unicode, workers: int=1, stats: RenderStats=None, file=None,
+               encoding: str=None, screen_height: int=SCREEN_HEIGHT, layout: str=LAYOUT,
+               cache: RenderCache=None, canvas: str=CANVAS):
+    '''
+    Output tree to `file`, a text or binary stream, stdout by default;
+    see `write_lines`.
+    Pages are rendered on `workers` processes if it isn't 1; see `draw_tree`.
+    Time per phase and counts are recorded in `stats`, if given.
+    `layout` is 'boxed', 'tidy' or 'indented', and `canvas` is 'list' or
+    'numpy'; see `iter_lines`.
+    If `cache` is given, output of a tree of the same content printed
+    with the same params is taken from the cache; see `cache.tree_key`.
+    '''
+    if file is None:
+        file = sys.stdout
+    lines = iter_lines(root, screen_width, margin, padding, charset, workers, stats, screen_height, layout,
+                       canvas)
+    if cache is not None:
+        with phase(stats, 'cache'):
+            key = tree_key(root, screen_width=screen_width, margin=margin, padding=padding, charset=charset,
+                           screen_height=screen_height, layout=layout)
+            text = None if key is None else cache.get(key)
+        if text is None and key is not None:
+            text = '\n'.join(lines)
+            cache.put(key, text)
+        if text is not None:
+            lines = text.split('\n')
+    write_lines(lines, file, encoding, stats=stats)
+
+
+def render_to_string(root, screen_width: int=SCREEN_WIDTH, margin: int=MARGIN, padding: int=PADDING,
+                     charset=charsets.Unicode, workers: int=1, stats: RenderStats=None,
+                     screen_height: int=SCREEN_HEIGHT, layout: str=LAYOUT, cache: RenderCache=None,
+                     canvas: str=CANVAS)->str:
+    '''
+    return output of `print_tree` as a string
+    '''
+    out = io.StringIO()
+    print_tree(root, screen_width, margin, padding, charset, workers, stats, file=out,
+               screen_height=screen_height, layout=layout, cache=cache, canvas=canvas)
+    return out.getvalue()
+
+
+def render_to_bytes(root, screen_width: int=SCREEN_WIDTH, margin: int=MARGIN, padding: int=PADDING,
+                    charset=charsets.Unicode, workers: int=1, stats: RenderStats=None,
+                    encoding: str='utf-8', screen_height: int=SCREEN_HEIGHT, layout: str=LAYOUT,
+                    cache: RenderCache=None, canvas: str=CANVAS)->bytes:
     '''
-    Output tree to stdout
+    return output of `print_tree` encoded with `encoding`
     '''
-    screens = draw_tree(root, screen_width, margin, padding, charset)
-    for i, screen in enumerate(screens):
-        print('page: {}'.format(i))
-        print_screen(screen)
-        # print page separator
-        if i != len(screens)-1:
-            print(draw_line(screen_width, charset))
+    out = io.BytesIO()
+    print_tree(root, screen_width, margin, padding, charset, workers, stats, file=out, encoding=encoding,
+               screen_height=screen_height, layout=layout, cache=cache, canvas=canvas)
+    return out.getvalue()
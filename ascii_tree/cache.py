@@ -0,0 +1,152 @@
+'''
+Cache of rendered output, for trees that are printed repeatedly.
+
+Output is keyed by a hash of the tree's content, i.e. the values,
+box dimensions and shape of the tree, and the params it's printed
+with, so a changed tree or param misses the cache.
+'''
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Optional
+from .params import RENDER_CACHE_SIZE
+from .custom_types import Node, SharedNode
+from .compact import CompactTree
+
+# nodes hashed per update of the hash
+_HASH_BATCH = 4096
+
+
+def tree_key(root, **params)->Optional[str]:
+    '''
+    return hex digest of tree rooted at `root`, a `Node` or `CompactTree`,
+    and `params`, e.g. `screen_width`; None for other roots.
+    Box dimensions of nodes are part of the key, so it depends on
+    `box_max_width` and the padding of boxes.
+    '''
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(repr(sorted((name, _param_key(val)) for name, val in params.items())).encode())
+    if isinstance(root, CompactTree):
+        digest.update(repr((root.box_max_width, root.padding)).encode())
+        digest.update(root.parent.tobytes())
+        _update_vals(digest, root.vals)
+    elif isinstance(root, Node):
+        # pre-order, with number of children, determines the shape of the tree
+        parts = []
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if node.__class__ is SharedNode:
+                # same key as the tree with shared subtrees copied
+                node = node.target
+            box = node.box
+            parts.append(f'{len(node.val)}:{node.val}{box.box_width},{box.line_width},{box.box_height},'
+                         f'{len(node.children)};')
+            stack.extend(reversed(node.children))
+            if len(parts) == _HASH_BATCH:
+                digest.update(''.join(parts).encode('utf-8', 'surrogatepass'))
+                parts.clear()
+        digest.update(''.join(parts).encode('utf-8', 'surrogatepass'))
+    else:
+        return None
+    return digest.hexdigest()
+
+
+def _update_vals(digest, vals):
+    for start in range(0, len(vals), _HASH_BATCH):
+        digest.update(''.join(f'{len(val)}:{val}' for val in vals[start:start + _HASH_BATCH])
+                      .encode('utf-8', 'surrogatepass'))
+
+
+def _param_key(val):
+    '''
+    params are compared by value; charsets by their characters
+    '''
+    if hasattr(val, 'xside'):
+        return sorted(vars(val).items())
+    return val
+
+
+class RenderCache:
+    '''
+    LRU of rendered output keyed by `tree_key`; pass it as `cache`
+    to `print_tree`, `render_to_string` or `render_to_bytes`.
+    Entries are kept in memory, or as files in directory `path` if
+    given, so they're shared between processes and runs.
+    At most `max_entries` entries are kept.
+    '''
+    def __init__(self, max_entries: int=RENDER_CACHE_SIZE, path: str=None):
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    def get(self, key: str)->Optional[str]:
+        '''
+        return cached text of `key`, or None
+        '''
+        if self.path is None:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+        else:
+            text = self._read(key)
+        if text is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return text
+
+    def put(self, key: str, text: str):
+        if self.path is None:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        else:
+            self._write(key, text)
+
+    def clear(self):
+        self._entries.clear()
+        if self.path is not None:
+            for name in self._files():
+                os.remove(os.path.join(self.path, name))
+
+    def __len__(self):
+        if self.path is None:
+            return len(self._entries)
+        return len(self._files())
+
+    def _files(self):
+        return [name for name in os.listdir(self.path) if name.endswith('.txt')]
+
+    def _read(self, key: str)->Optional[str]:
+        filename = os.path.join(self.path, key + '.txt')
+        try:
+            with open(filename, encoding='utf-8') as fp:
+                text = fp.read()
+        except FileNotFoundError:
+            return None
+        # modification time orders entries by recent use
+        os.utime(filename)
+        return text
+
+    def _write(self, key: str, text: str):
+        filename = os.path.join(self.path, key + '.txt')
+        # written under a temporary name, so readers never see a partial entry
+        temp = f'{filename}.{os.getpid()}.tmp'
+        with open(temp, 'w', encoding='utf-8') as fp:
+            fp.write(text)
+        os.replace(temp, filename)
+
+        names = self._files()
+        if len(names) > self.max_entries:
+            paths = sorted((os.path.join(self.path, name) for name in names), key=os.path.getmtime)
+            for path in paths[:len(paths) - self.max_entries]:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,331 @@
+'''
+Array-backed, columnar tree representation.
+
+Instead of a `Node` and an `AsciiBox` object per node, every
+attribute is stored in a column (an `array`), and node `i` is
+described by the i-th entry of each column. This keeps very large
+trees to a few dozen bytes per node.
+'''
+from array import array
+from collections import deque
+from typing import Any, Callable, Iterator, List, Tuple
+from . import charsets
+from .params import MARGIN, PADDING, BOX_MAX_WIDTH
+from .custom_types import Node, SharedNode, BoxSpec, Offset, box_dims
+from .draw import draw_boxes
+
+# index used for a missing parent/child/sibling
+NIL = -1
+
+
+class CompactTree:
+    '''
+    Columnar store of a tree.
+    Nodes are linked through parent/first-child/next-sibling
+    index columns. A parent is always added before its children, so
+    iterating indices in reverse order visits children before parents
+    and iterating in order visits parents before children;
+    the layout passes are flat sweeps over the columns.
+    '''
+    def __init__(self, box_max_width: int=BOX_MAX_WIDTH, padding: int=PADDING):
+        self.box_max_width = box_max_width
+        self.padding = padding
+        # node values
+        self.vals = []
+        # tree structure
+        self.parent = array('i')
+        self.first_child = array('i')
+        self.last_child = array('i')
+        self.next_sibling = array('i')
+        # box dimensions
+        self.box_width = array('i')
+        self.box_height = array('i')
+        self.line_width = array('i')
+        # layout, computed by `layout`
+        self.tree_width = array('q')
+        self.tree_left_offset = array('q')
+        self.left = array('q')
+        self.top = array('q')
+
+    def __len__(self):
+        return len(self.vals)
+
+    def add(self, val, parent: int=NIL)->int:
+        '''
+        add a node with value `val` as the last child of `parent`
+        or as the root if `parent` is NIL.
+        Returns index of the new node
+        '''
+        idx = len(self.vals)
+        if parent == NIL:
+            if idx != 0:
+                raise ValueError('Tree already has a root')
+        elif not 0 <= parent < idx:
+            raise IndexError(f'Invalid parent index {parent}')
+
+        text = str(val)
+        box_width, line_width, box_height, _ = box_dims(text, self.box_max_width, self.padding)
+        self.vals.append(text)
+        self.parent.append(parent)
+        self.first_child.append(NIL)
+        self.last_child.append(NIL)
+        self.next_sibling.append(NIL)
+        self.box_width.append(box_width)
+        self.box_height.append(box_height)
+        self.line_width.append(line_width)
+        self.tree_width.append(box_width)
+        self.tree_left_offset.append(0)
+        self.left.append(0)
+        self.top.append(0)
+
+        if parent != NIL:
+            if self.first_child[parent] == NIL:
+                self.first_child[parent] = idx
+            else:
+                self.next_sibling[self.last_child[parent]] = idx
+            self.last_child[parent] = idx
+        return idx
+
+    @classmethod
+    def from_source(cls, root: Any, get_val: Callable[[Any], Any], get_children: Callable[[Any], List],
+                    **box_params)->'CompactTree':
+        '''
+        build from an arbitrary tree; see `external.transformed_tree`.
+        Nodes are stored in level order.
+        '''
+        tree = cls(**box_params)
+        queue = deque([(root, NIL)])
+        while queue:
+            node, parent = queue.popleft()
+            idx = tree.add(get_val(node), parent)
+            queue.extend((child, idx) for child in get_children(node))
+        return tree
+
+    @classmethod
+    def from_node(cls, root: Node, **box_params)->'CompactTree':
+        '''
+        build from a tree of `Node`; shared subtrees are
+        copied at each occurrence
+        '''
+        return cls.from_source(root, lambda node: node.val, _node_children, **box_params)
+
+    def node(self, idx: int=0)->'CompactNode':
+        '''
+        return a `CompactNode` view of node `idx`
+        '''
+        return CompactNode(self, idx)
+
+    def to_node(self)->Node:
+        '''
+        convert to a tree of `Node`
+        '''
+        nodes = []
+        for idx, val in enumerate(self.vals):
+            node = Node.init_with_box(val, box_max_width=self.box_max_width, padding=self.padding)
+            nodes.append(node)
+            if idx:
+                nodes[self.parent[idx]].children.append(node)
+        return nodes[0]
+
+    def children(self, idx: int)->Iterator[int]:
+        '''
+        iterate over indices of children of `idx`
+        '''
+        child = self.first_child[idx]
+        while child != NIL:
+            yield child
+            child = self.next_sibling[child]
+
+    def is_leaf(self, idx: int)->bool:
+        return self.first_child[idx] == NIL
+
+    @property
+    def width(self)->int:
+        '''
+        width of the tree; requires `layout`
+        '''
+        return self.tree_width[0]
+
+    def height(self)->int:
+        '''
+        height of the tree; requires `layout`
+        '''
+        return max(top + height for top, height in zip(self.top, self.box_height))
+
+    def layout(self, margin: int=MARGIN)->int:
+        '''
+        compute tree_width, tree_left_offset and box position
+        of every node. Matches `get_node_widths` and `position_nodes`
+        on the equivalent tree of `Node`.
+        Returns width of tree.
+        '''
+        count = len(self)
+        parent = self.parent
+        first_child, last_child, next_sibling = self.first_child, self.last_child, self.next_sibling
+        box_width, box_height = self.box_width, self.box_height
+        tree_width, tree_left_offset = self.tree_width, self.tree_left_offset
+        left, top = self.left, self.top
+
+        # bottom-up sweep: sum children widths into parents
+        child_width = array('q', bytes(8 * count))
+        child_count = array('q', bytes(8 * count))
+        for idx in range(count - 1, -1, -1):
+            width = box_width[idx]
+            if child_count[idx]:
+                # n children need n-1 spaces between them
+                width = max(child_width[idx] + margin * (child_count[idx] - 1), width)
+            tree_width[idx] = width
+            pidx = parent[idx]
+            if pidx != NIL:
+                child_width[pidx] += width
+                child_count[pidx] += 1
+
+        # top-down sweep: place the space of each child
+        # after the space of its previous sibling
+        tree_left_offset[0] = 0
+        top[0] = 0
+        for idx in range(count):
+            child = first_child[idx]
+            offset = tree_left_offset[idx]
+            child_top = top[idx] + box_height[idx] + margin
+            while child != NIL:
+                tree_left_offset[child] = offset
+                top[child] = child_top
+                offset += tree_width[child] + margin
+                child = next_sibling[child]
+
+        # bottom-up sweep: place parent between first and last child
+        for idx in range(count - 1, -1, -1):
+            first = first_child[idx]
+            if first == NIL:
+                left[idx] = tree_left_offset[idx]
+            else:
+                left[idx] = tree_left_offset[idx] + (left[last_child[idx]] - left[first]) // 2
+
+        return tree_width[0]
+
+    def flatten(self)->Tuple[List[BoxSpec], List[Tuple[int, int]]]:
+        '''
+        flatten into boxes and edges; requires `layout`.
+        see `draw.flatten`
+        '''
+        boxes = []
+        # box index of each node
+        box_idx = array('i', bytes(4 * len(self)))
+        # nodes in draw order
+        order = []
+        stack = [0]
+        while stack:
+            idx = stack.pop()
+            box_idx[idx] = len(boxes)
+            boxes.append(BoxSpec(self.vals[idx], self.left[idx], self.top[idx], self.box_width[idx],
+                                 self.line_width[idx], self.box_height[idx]))
+            order.append(idx)
+            stack.extend(self.children(idx))
+        edges = [(box_idx[idx], box_idx[child]) for idx in order for child in self.children(idx)]
+        return boxes, edges
+
+    def draw(self, screen: List[List[str]], padding: int=PADDING, charset=charsets.Unicode):
+        '''
+        draw nodes and edges onto screen; requires `layout`.
+        see `draw.draw`
+        '''
+        boxes, edges = self.flatten()
+        draw_boxes(screen, boxes, edges, padding, charset)
+
+
+class CompactNode:
+    '''
+    View of node `idx` of a `CompactTree`, so the layout functions for
+    trees of `Node`, e.g. `split_tree` and `tidy_layout`, operate on the
+    columns. Views are created on demand, e.g. by `children`, and hold no
+    state of their own; the width and position are read from and written
+    to the columns. Views of the same node are equal.
+    Serves as its own box, like `PageNode`.
+    '''
+    __slots__ = ('tree', 'idx')
+
+    def __init__(self, tree: CompactTree, idx: int):
+        self.tree = tree
+        self.idx = idx
+
+    def __eq__(self, other):
+        return other.__class__ is CompactNode and other.idx == self.idx and other.tree is self.tree
+
+    def __hash__(self):
+        return hash(self.idx)
+
+    def __repr__(self):
+        return self.tree.vals[self.idx]
+
+    def __str__(self):
+        return self.tree.vals[self.idx]
+
+    @property
+    def val(self):
+        return self.tree.vals[self.idx]
+
+    @property
+    def children(self)->List['CompactNode']:
+        tree = self.tree
+        return [CompactNode(tree, child) for child in tree.children(self.idx)]
+
+    @property
+    def is_leaf(self):
+        return self.tree.first_child[self.idx] == NIL
+
+    @property
+    def box(self):
+        return self
+
+    @property
+    def text(self):
+        return self.tree.vals[self.idx]
+
+    @property
+    def box_width(self):
+        return self.tree.box_width[self.idx]
+
+    width = box_width
+
+    @property
+    def line_width(self):
+        return self.tree.line_width[self.idx]
+
+    @property
+    def box_height(self):
+        return self.tree.box_height[self.idx]
+
+    @property
+    def content_height(self):
+        return self.tree.box_height[self.idx] - 2*self.tree.padding - 2
+
+    @property
+    def tree_width(self):
+        return self.tree.tree_width[self.idx]
+
+    @tree_width.setter
+    def tree_width(self, width):
+        self.tree.tree_width[self.idx] = width
+
+    @property
+    def tree_left_offset(self):
+        return self.tree.tree_left_offset[self.idx]
+
+    @tree_left_offset.setter
+    def tree_left_offset(self, offset):
+        self.tree.tree_left_offset[self.idx] = offset
+
+    @property
+    def position(self)->Offset:
+        return Offset(self.tree.left[self.idx], self.tree.top[self.idx])
+
+    @position.setter
+    def position(self, position: Offset):
+        self.tree.left[self.idx], self.tree.top[self.idx] = position
+
+
+def _node_children(node):
+    if node.__class__ is SharedNode:
+        return node.target.children
+    return node.children
@@ -1,19 +1,25 @@
 import math
-from collections import namedtuple, deque
+from collections import namedtuple
 from copy import copy
-from .params import PADDING, BOX_MAX_WIDTH
+from functools import lru_cache
+from typing import Tuple
+from .params import PADDING, BOX_MAX_WIDTH, BOX_CACHE_SIZE
 
 # position offset
 Offset = namedtuple('Offset', 'left top')
+# a positioned box, as drawn
+BoxSpec = namedtuple('BoxSpec', 'text left top box_width line_width box_height')
 
 
 class Node:
     '''
     Representing a node of the user tree
     '''
+    __slots__ = ('val', 'children', 'box')
+
     def __init__(self, val):
         self.val = str(val)
-        self.children = deque()
+        self.children = []
         # reference to its AsciiBox
         self.box = None
 
@@ -52,6 +58,9 @@ class AsciiBox:
     Holds parameters associated with drawing
     ascii box containing some text.
     '''
+    __slots__ = ('text', 'box_width', 'line_width', 'box_height', 'content_height',
+                 'tree_width', 'position', 'tree_left_offset')
+
     def __init__(self, text: str, box_max_width: int=BOX_MAX_WIDTH, padding: int=PADDING):
         self.text = text
         # width of encapsulating box (includes border chars)
@@ -83,24 +92,232 @@ class AsciiBox:
 
     def box_dims(self, text: str, box_max_width: int, padding: int):
         '''
-        determine the box dimensions, i.e.
-        box_width (width including border chars)
-        line_width (number of text chars)
-        box_height (height including border chars)
-        content_height (lines of wrapped text)
+        determine the box dimensions; see `box_dims`
         '''
-        # max text per line; each line has 2 paddings and 2 border chars
-        max_line_width = box_max_width - 2*padding - 2
-        if  max_line_width >= len(text):
-            box_width = len(text) + 2*padding + 2
-            line_width = len(text)
-        else:
-            # entire text won't fit on one line; wrap
-            box_width = box_max_width
-            line_width = max_line_width
-
-        content_height = math.ceil(len(text) / line_width)
-        # box height is height of content + 2 paddings + 2 border chars
-        box_height = content_height + 2*padding + 2
-
-        return box_width, line_width, box_height, content_height
+        return box_dims(text, box_max_width, padding)
+
+
+@lru_cache(maxsize=BOX_CACHE_SIZE)
+def box_dims(text: str, box_max_width: int=BOX_MAX_WIDTH, padding: int=PADDING):
+    '''
+    determine the box dimensions, i.e.
+    box_width (width including border chars)
+    line_width (number of text chars)
+    box_height (height including border chars)
+    content_height (lines of wrapped text)
+    Cached, since the same labels tend to repeat across a tree.
+    '''
+    # max text per line; each line has 2 paddings and 2 border chars
+    max_line_width = box_max_width - 2*padding - 2
+    if  max_line_width >= len(text):
+        box_width = len(text) + 2*padding + 2
+        line_width = len(text)
+    else:
+        # entire text won't fit on one line; wrap
+        box_width = box_max_width
+        line_width = max_line_width
+
+    content_height = math.ceil(len(text) / line_width)
+    # box height is height of content + 2 paddings + 2 border chars
+    box_height = content_height + 2*padding + 2
+
+    return box_width, line_width, box_height, content_height
+
+
+class PageNode:
+    '''
+    View of a node that is split across pages, as laid out on one page.
+    Refers to the node for its value and box dimensions, and only holds
+    the children on this page and the width and position on this page.
+    Serves as its own box, i.e. has the attributes of both `Node` and `AsciiBox`
+    used for layout and drawing.
+    '''
+    __slots__ = ('node', 'children', 'tree_width', 'position', 'tree_left_offset')
+
+    def __init__(self, node: Node):
+        self.node = node
+        self.children = []
+        self.tree_width = node.box.tree_width
+        self.position = None
+        self.tree_left_offset = None
+
+    def __repr__(self):
+        return self.node.val
+
+    def __str__(self):
+        return self.node.val
+
+    @property
+    def val(self):
+        return self.node.val
+
+    @property
+    def box(self):
+        return self
+
+    @property
+    def is_leaf(self):
+        return len(self.children) == 0
+
+    @property
+    def text(self):
+        return self.node.box.text
+
+    @property
+    def box_width(self):
+        return self.node.box.box_width
+
+    @property
+    def line_width(self):
+        return self.node.box.line_width
+
+    @property
+    def box_height(self):
+        return self.node.box.box_height
+
+    @property
+    def content_height(self):
+        return self.node.box.content_height
+
+    @property
+    def width(self):
+        return self.node.box.box_width
+
+
+class ContNode:
+    '''
+    "Cont. on page" message attached to a `PageNode`, i.e. a leaf that
+    refers to the page where the children of the node continue.
+    `val` is a template until the page number is filled in
+    by `update_page_nums`. Serves as its own box, like `PageNode`;
+    the box is laid out with the dimensions shared by all instances,
+    `width` and `box_height`, but a box is drawn wider if its page
+    number doesn't fit.
+    '''
+    __slots__ = ('val', 'box_width', 'line_width', 'tree_width', 'position', 'tree_left_offset')
+    # leave space for 2 digit page numbers
+    template = 'Cont. on page {}  '
+    children = ()
+    is_leaf = True
+    width, _line_width, box_height, content_height = box_dims(template)
+
+    def __init__(self):
+        self.val = self.template
+        self.box_width = self.width
+        self.line_width = self._line_width
+        self.tree_width = self.width
+        self.position = None
+        self.tree_left_offset = None
+
+    def __repr__(self):
+        return self.val
+
+    def __str__(self):
+        return self.val
+
+    @property
+    def box(self):
+        return self
+
+    @property
+    def text(self):
+        return self.val
+
+
+class SharedRoot(Node):
+    '''
+    Root of a tree that may contain `SharedNode`s;
+    see `external.transformed_tree`
+    '''
+    __slots__ = ()
+
+
+class SharedNode:
+    '''
+    Occurrence of a subtree that occurs more than once in a tree, i.e.
+    of `target`, which isn't itself in the tree. The subtree is laid out
+    once, relative to the origin, and each occurrence is drawn as a copy of it;
+    see `shared.prepare_shared`.
+    To layout, it's a leaf as wide and as tall as the subtree, whose position
+    is that of the root of the subtree. Serves as its own box, like `PageNode`.
+    '''
+    __slots__ = ('target', 'tree_width', 'tree_left_offset', 'subtree_height', '_position')
+    children = ()
+    is_leaf = True
+
+    def __init__(self, target: Node):
+        self.target = target
+        self.tree_width = None
+        self.tree_left_offset = None
+        # set by `shared.prepare_shared`
+        self.subtree_height = None
+        self._position = None
+
+    def __repr__(self):
+        return self.target.val
+
+    def __str__(self):
+        return self.target.val
+
+    @property
+    def val(self):
+        return self.target.val
+
+    @property
+    def box(self):
+        return self
+
+    @property
+    def position(self):
+        # laid out as a leaf, at the left of the space of the subtree
+        if self._position is None:
+            return None
+        return Offset(self._position.left + self.target.box.position.left, self._position.top)
+
+    @position.setter
+    def position(self, position: Offset):
+        self._position = position
+
+    @property
+    def text(self):
+        return self.target.box.text
+
+    @property
+    def box_width(self):
+        return self.target.box.box_width
+
+    @property
+    def line_width(self):
+        return self.target.box.line_width
+
+    @property
+    def box_height(self):
+        return self.subtree_height
+
+    @property
+    def content_height(self):
+        return self.target.box.content_height
+
+    @property
+    def width(self):
+        return self.target.box.tree_width
+
+
+@lru_cache(maxsize=BOX_CACHE_SIZE)
+def wrap_lines(text: str, line_width: int)->Tuple[str, ...]:
+    '''
+    split text into lines of line_width chars, as drawn in a box
+    '''
+    return tuple(text[idx:idx + line_width] for idx in range(0, len(text), line_width))
+
+
+def box_cache_info()->dict:
+    '''
+    hit/miss statistics of the box measurement and wrapping caches
+    '''
+    return {'box_dims': box_dims.cache_info(), 'wrap_lines': wrap_lines.cache_info()}
+
+
+def clear_box_cache():
+    box_dims.cache_clear()
+    wrap_lines.cache_clear()
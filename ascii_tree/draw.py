@@ -2,77 +2,66 @@
 Functions for drawing
 '''
 from . import charsets
-from typing import List
+from operator import itemgetter
+from typing import Iterator, List, Tuple
 from .params import PADDING
-from .custom_types import Node, Offset
+from .custom_types import Node, Offset, BoxSpec, SharedNode, wrap_lines
+
+# number of rows `iter_rows` holds in memory at once
+BAND_HEIGHT = 64
 
 
 def draw_node(screen: list, text: str, left_bound: int, top_bound: int, box_width: int,
               line_width: int, padding: int=PADDING, charset=charsets.Ascii):
     '''
-    Update screen buffer with node ascii repr
+    Update screen buffer with node ascii repr.
+    Each horizontal run of a row is written with a single
+    slice assignment.
     '''
     # inclusive left and right boundaries
     right_bound = left_bound + box_width
 
-    # top border
-    for i in range(left_bound+1, right_bound):
-        screen[top_bound][i] = charset.top
-    # top-left corner
-    screen[top_bound][left_bound] = charset.top_left
-    # top-right corner
-    screen[top_bound][right_bound] = charset.top_right
-
-    # top padding
-    row_idx = top_bound + 1
-    for p in range(padding):
-        for i in range(left_bound, right_bound+1):
-            if i == left_bound:
-                screen[row_idx + p][i] = charset.left
-            elif i == right_bound:
-                screen[row_idx + p][i] = charset.right
+    # top border, with top-left and top-right corners
+    screen[top_bound][left_bound:right_bound+1] = \
+        [charset.top_left] + [charset.top]*(box_width-1) + [charset.top_right]
+
+    # top padding; only the box walls are drawn
+    _draw_walls(screen, left_bound, right_bound, top_bound + 1, padding, charset)
+    row_idx = top_bound + 1 + padding
 
     # create body of box
     # each row will contain box_width total characters
     # and line_width text chars
-    row_idx += padding
-    idx = 0  # iterates over chars in text
-    while idx < len(text):
-        # left boundary
-        screen[row_idx][left_bound] = charset.left
-        # left padding
-        for i in range(padding):
-            screen[row_idx][left_bound + i + 1] = ' '
-        # content
-        subtext = text[idx:idx + line_width]
-        text_lbound = left_bound + padding + 1
-        screen[row_idx][text_lbound: text_lbound+len(subtext)] = subtext
-        # right padding
-        for i in range(padding):
-            screen[row_idx][right_bound - i - 1] = ' '
-        # right boundary
-        screen[row_idx][right_bound] = charset.right
-        idx += line_width
+    pad = [' ']*padding
+    # left boundary and left padding precede text
+    text_lbound = left_bound + padding + 1
+    left_wall = [charset.left] + pad
+    # right padding and right boundary
+    right_wall = pad + [charset.right]
+    for subtext in wrap_lines(text, line_width):
+        row = screen[row_idx]
+        row[left_bound:text_lbound+len(subtext)] = left_wall + list(subtext)
+        row[right_bound-padding:right_bound+1] = right_wall
         row_idx += 1
 
     # bottom padding
-    for p in range(padding):
-        for i in range(left_bound, right_bound+1):
-            if i == left_bound:
-                screen[row_idx + p][i] = charset.left
-            elif i == right_bound:
-                screen[row_idx + p][i] = charset.right
+    _draw_walls(screen, left_bound, right_bound, row_idx, padding, charset)
+    bottom_bound = row_idx + padding
 
-    row_idx += padding
+    # bottom border, with bottom-left and bottom-right corners
+    screen[bottom_bound][left_bound:right_bound+1] = \
+        [charset.bottom_left] + [charset.bottom]*(box_width-1) + [charset.bottom_right]
 
-    bottom_bound = row_idx
-    # bottom-left corner
-    screen[bottom_bound][left_bound] = charset.bottom_left
-    # bottom-right corner
-    screen[bottom_bound][right_bound] = charset.bottom_right
-    # bottom border
-    for i in range(left_bound+1, right_bound):
-        screen[bottom_bound][i] = charset.bottom
+
+def _draw_walls(screen, left_bound: int, right_bound: int, top: int, height: int, charset):
+    '''
+    draw left and right walls of a box on `height` rows
+    starting at row `top`
+    '''
+    for row_idx in range(top, top + height):
+        row = screen[row_idx]
+        row[left_bound] = charset.left
+        row[right_bound] = charset.right
 
 
 def draw_edge(screen, src: Node, dest: Node, charset=charsets.Ascii):
@@ -83,46 +72,46 @@ def draw_edge(screen, src: Node, dest: Node, charset=charsets.Ascii):
     '''
     ascii_src = src.box
     ascii_dest = dest.box
+    draw_edge_at(screen, ascii_src.position.left, ascii_src.position.top, ascii_src.box_width,
+                 ascii_src.box_height, ascii_dest.position.left, ascii_dest.position.top,
+                 ascii_dest.box_width, charset)
+
+
+def draw_edge_at(screen, src_left: int, src_top: int, src_width: int, src_height: int,
+                 dest_left: int, dest_top: int, dest_width: int, charset=charsets.Ascii):
+    '''
+    draw an edge between the boxes at the given coordinates;
+    see `draw_edge`
+    '''
     # for dest, edge will connect in middle of top
-    dest_x = ascii_dest.position.left + ascii_dest.box_width // 2
-    dest_y = ascii_dest.position.top
+    dest_x = dest_left + dest_width // 2
+    dest_y = dest_top
 
-    src_lbound = ascii_src.position.left
-    src_rbound = ascii_src.position.left + ascii_src.box_width
-    src_ymiddle = ascii_src.position.top + ascii_src.box_height // 2
+    src_lbound = src_left
+    src_rbound = src_left + src_width
+    src_ymiddle = src_top + src_height // 2
     # based on entry point on dest, determine whether
     # the line will go from left, right, or center
     # of source
 
     if src_lbound > dest_x:
-        # edge will go from left of source box
-        # y-axis of where to extend from source
-        # draw horizontal leg
-        for i in range(src_lbound, dest_x-1, -1):
-            screen[src_ymiddle][i] = charset.xside
-        # draw left out going portrusion
-        screen[src_ymiddle][src_lbound] = charset.left_out
-        # draw elbow of edge
-        screen[src_ymiddle][dest_x] = charset.top_left
-        # draw vertical leg
-        for i in range(src_ymiddle+1, dest_y):
-            screen[i][dest_x] = charset.yside
+        # edge will go from left of source box:
+        # horizontal leg from elbow to left out going protrusion
+        screen[src_ymiddle][dest_x:src_lbound+1] = \
+            [charset.top_left] + [charset.xside]*(src_lbound-dest_x-1) + [charset.left_out]
+        # vertical leg
+        _draw_column(screen, dest_x, src_ymiddle+1, dest_y, charset.yside)
     elif src_rbound < dest_x:
-        # edge will go from right of source box
-        for i in range(src_rbound, dest_x+1):
-            screen[src_ymiddle][i] = charset.xside
-        # right protrusion
-        screen[src_ymiddle][src_rbound] = charset.right_out
-        # elbow
-        screen[src_ymiddle][dest_x] = charset.top_right
-        # then draw vertical leg
-        for i in range(src_ymiddle+1, dest_y):
-            screen[i][dest_x] = charset.yside
+        # edge will go from right of source box:
+        # horizontal leg from right protrusion to elbow
+        screen[src_ymiddle][src_rbound:dest_x+1] = \
+            [charset.right_out] + [charset.xside]*(dest_x-src_rbound-1) + [charset.top_right]
+        # vertical leg
+        _draw_column(screen, dest_x, src_ymiddle+1, dest_y, charset.yside)
     else:
         # edge will go from underneath source box
-        src_ybottom = ascii_src.box_height + ascii_src.position.top
-        for i in range(src_ybottom, dest_y):
-            screen[i][dest_x] = charset.yside
+        src_ybottom = src_height + src_top
+        _draw_column(screen, dest_x, src_ybottom, dest_y, charset.yside)
         # bottom protrusion - goes on box which is one unit
         # higher hence -1
         screen[src_ybottom-1][dest_x] = charset.bottom_out
@@ -131,25 +120,169 @@ def draw_edge(screen, src: Node, dest: Node, charset=charsets.Ascii):
     screen[dest_y][dest_x] = charset.top_out
 
 
-def draw(screen: List[List[str]], root: Node, padding: int=PADDING, charset=charsets.Unicode):
+def _draw_column(screen, col: int, top: int, bottom: int, char: str):
     '''
-    traverse tree and draw nodes and edges
+    draw vertical run of `char` in column `col`,
+    from row `top` (inclusive) to `bottom` (exclusive)
+    '''
+    for row_idx in range(top, bottom):
+        screen[row_idx][col] = char
+
+
+def flatten(root: Node)->Tuple[List[BoxSpec], List[Tuple[int, int]]]:
     '''
-    stack = [root]
+    flatten a positioned tree into a list of boxes and
+    a list of edges, i.e. (src, dest) indices into boxes.
+    Boxes and edges are listed in the order they are drawn.
+    '''
+    boxes = []
     edges = []
+    stack = [(root, None)]
+    while stack:
+        node, parent_idx = stack.pop()
+        if node.__class__ is SharedNode:
+            _flatten_shared(node, parent_idx, boxes, edges)
+            continue
+        box = node.box
+        idx = len(boxes)
+        boxes.append(BoxSpec(node.val, box.position.left, box.position.top, box.box_width,
+                             box.line_width, box.box_height))
+        if parent_idx is not None:
+            edges[parent_idx].append(idx)
+        edges.append([])
+        for child in node.children:
+            stack.append((child, idx))
+    # children are popped in reverse order; edges of a node are drawn
+    # in order of its children, after the edges of nodes drawn before it
+    return boxes, [(src, dest) for src in range(len(boxes)) for dest in reversed(edges[src])]
+
+
+def _flatten_shared(occurrence: SharedNode, parent_idx: int, boxes: List[BoxSpec], edges: List[List[int]]):
+    '''
+    add boxes and edges of the subtree of `occurrence` to those of `flatten`,
+    in the same order as if the subtree was in the tree. The subtree is laid out
+    at the origin, and is translated to the offset of the occurrence.
+    '''
+    stack = [(occurrence, parent_idx, 0, 0)]
     while stack:
-        node = stack.pop()
-        left_bound, top_bound = node.box.position
-        box_width, line_width = node.box.box_width, node.box.line_width
-        draw_node(screen, node.val, left_bound, top_bound, box_width, line_width, padding, charset)
+        node, parent_idx, left, top = stack.pop()
+        if node.__class__ is SharedNode:
+            stack.append((node.target, parent_idx, left + node.tree_left_offset, top + node.position.top))
+            continue
+        box = node.box
+        idx = len(boxes)
+        boxes.append(BoxSpec(node.val, box.position.left + left, box.position.top + top, box.box_width,
+                             box.line_width, box.box_height))
+        if parent_idx is not None:
+            edges[parent_idx].append(idx)
+        edges.append([])
         for child in node.children:
-            # order doesn't matter since each node is drawn independently
-            stack.append(child)
-            edges.append((node, child))
+            stack.append((child, idx, left, top))
+
+
+def draw_boxes(screen: List[List[str]], boxes: List[BoxSpec], edges: List[Tuple[int, int]],
+               padding: int=PADDING, charset=charsets.Unicode):
+    '''
+    draw flattened boxes and edges; see `flatten`
+    '''
+    for box in boxes:
+        draw_node(screen, box.text, box.left, box.top, box.box_width, box.line_width, padding, charset)
     # draw edges at the end since draw_edge handles
     # adding outgoing protrusion chars on box
-    for node, child in edges:
-        draw_edge(screen, node, child, charset)
+    for src, dest in edges:
+        _draw_edge_between(screen, boxes[src], boxes[dest], charset)
+
+
+def _draw_edge_between(screen, src: BoxSpec, dest: BoxSpec, charset):
+    draw_edge_at(screen, src.left, src.top, src.box_width, src.box_height,
+                 dest.left, dest.top, dest.box_width, charset)
+
+
+def draw(screen: List[List[str]], root: Node, padding: int=PADDING, charset=charsets.Unicode):
+    '''
+    traverse tree and draw nodes and edges
+    '''
+    boxes, edges = flatten(root)
+    draw_boxes(screen, boxes, edges, padding, charset)
+
+
+def page_height(boxes: List[BoxSpec])->int:
+    '''
+    number of rows needed to draw boxes
+    '''
+    return max(box.top + box.box_height for box in boxes)
+
+
+def page_width(boxes: List[BoxSpec])->int:
+    '''
+    number of columns needed to draw boxes; the right
+    wall of a box is at column left + box_width
+    '''
+    return max(box.left + box.box_width for box in boxes) + 1
+
+
+class _Band:
+    '''
+    screen-like view over the rows of a horizontal band.
+    writes to rows outside the band go to a scratch row.
+    '''
+    def __init__(self, rows: List[List[str]], top: int, width: int):
+        self.rows = rows
+        self.top = top
+        self.scratch = [' ']*width
+
+    def __getitem__(self, row_idx: int)->List[str]:
+        row_idx -= self.top
+        if 0 <= row_idx < len(self.rows):
+            return self.rows[row_idx]
+        return self.scratch
+
+
+def iter_rows(boxes: List[BoxSpec], edges: List[Tuple[int, int]], width: int, height: int=None,
+              padding: int=PADDING, charset=charsets.Unicode, band_height: int=BAND_HEIGHT)->Iterator[str]:
+    '''
+    yield rendered rows (right stripped) top-down.
+    Only a band of `band_height` rows is held in memory at a time;
+    each band is drawn with the boxes and edges that touch it,
+    in the same order as `draw_boxes`, so the output is identical to
+    drawing the whole screen at once.
+    '''
+    if height is None:
+        height = page_height(boxes)
+    # a box can stick out past the width the layout assumed
+    width = max(width, page_width(boxes))
+
+    # (first row, last row, kind, draw order) of each item,
+    # kind 0 is a box, 1 is an edge, i.e. boxes are drawn first
+    spans = [(box.top, box.top + box.box_height - 1, 0, idx) for idx, box in enumerate(boxes)]
+    for idx, (src, dest) in enumerate(edges):
+        # an edge starts at middle (or bottom) of src and goes down to dest
+        spans.append((boxes[src].top + boxes[src].box_height // 2, boxes[dest].top, 1, idx))
+    spans.sort()
+
+    draw_order = itemgetter(2, 3)
+    active = []
+    next_span = 0
+    for band_top in range(0, height, band_height):
+        band_bottom = min(band_top + band_height, height)
+        while next_span < len(spans) and spans[next_span][0] < band_bottom:
+            active.append(spans[next_span])
+            next_span += 1
+        # discard items that ended above this band
+        active = [span for span in active if span[1] >= band_top]
+        active.sort(key=draw_order)
+
+        rows = [[' ']*width for _ in range(band_bottom - band_top)]
+        band = _Band(rows, band_top, width)
+        for _, _, kind, idx in active:
+            if kind == 0:
+                box = boxes[idx]
+                draw_node(band, box.text, box.left, box.top, box.box_width, box.line_width, padding, charset)
+            else:
+                src, dest = edges[idx]
+                _draw_edge_between(band, boxes[src], boxes[dest], charset)
+        for row in rows:
+            yield ''.join(row).rstrip()
 
 
 def draw_line(width, charset=charsets.Unicode)->str:
@@ -2,38 +2,377 @@
 Utilities for external interactions
 '''
 from . import charsets
-from typing import Callable, Any, List
-from .ascii_tree import print_tree
-from .custom_types import Node
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Any, Iterable, List, Tuple
+import sys
+from .ascii_tree import print_tree, write_lines
+from .custom_types import Node, SharedNode, SharedRoot
+from .stats import phase
+from .indented import iter_indented
 
 
 # params may overlap
-SCREEN_PARAM_NAMES = ['screen_width', 'margin', 'padding', 'charset']
+SCREEN_PARAM_NAMES = ['screen_width', 'screen_height', 'margin', 'padding', 'charset', 'layout', 'workers']
 BOX_PARAM_NAMES = ['padding', 'box_max_width']
+TRANSFORM_PARAM_NAMES = ['max_depth', 'max_children', 'fetch_workers', 'max_repeats']
 # updated param values
 _screen_params = {}
 _box_params = {}
+_transform_params = {}
 
+# how a source tree is transformed; shared by the nodes that
+# may be expanded later. `shared` maps share keys to
+# [transformed node, its parent until it's shared, number of occurrences counted]
+Adapter = namedtuple('Adapter', 'get_val get_children max_depth max_children box_params fetch_workers get_children_many '
+                                'share_key max_repeats shared')
 
-def transformed_tree(root: Any, get_val: Callable[[Any], Any], get_children: Callable[[Any], List])->Node:
+
+class LazyNode(Node):
+    '''
+    `Node` at the depth limit of `transformed_tree`; its
+    children are not fetched until it's expanded
+    '''
+    __slots__ = ('source', 'adapter')
+
+    def __init__(self, val):
+        super().__init__(val)
+        self.source = None
+        # set to None once expanded
+        self.adapter = None
+
+
+class MoreNode(Node):
+    '''
+    Summary of the children left out by the children limit
+    of `transformed_tree`, i.e. children of `source` from index `skip` on;
+    it's the last child of `parent`
+    '''
+    __slots__ = ('source', 'adapter', 'skip', 'parent')
+
+    def __init__(self, val):
+        super().__init__(val)
+        self.source = None
+        self.adapter = None
+        self.skip = 0
+        self.parent = None
+
+
+def transformed_tree(root: Any, get_val: Callable[[Any], Any], get_children: Callable[[Any], Iterable],
+                     max_depth: int=None, max_children: int=None, fetch_workers: int=None,
+                     get_children_many: Callable[[List], Iterable[Iterable]]=None,
+                     share_key: Callable[[Any], Any]=None, max_repeats: int=None)->Node:
     '''
     Utility func
     transform tree from arbitrary node type
     to tree of `Node`. This is needed since
     functions here assume the Node structure.
     `get_val` and `get_children` are callables that when called
-    on source node, return val and children (list) respectively.
+    on source node, return val and children (iterable) respectively.
+
+    Optionally, only `max_depth` levels below root are transformed;
+    nodes at that depth are `LazyNode`s whose children are not fetched.
+    At most `max_children` children of a node are transformed; the rest
+    are summarized by a "+N more" `MoreNode`. Both can be expanded on
+    demand with `expand`. `max_children` must be at least 1.
+
+    If `fetch_workers` is given, the tree is transformed breadth-first and
+    `get_val`/`get_children` are called for a whole level at once, on up
+    to `fetch_workers` threads, e.g. when they query a database.
+    `get_children_many`, if given, is used instead of `get_children`; it's
+    called with a list of source nodes of a level, split into up to `fetch_workers`
+    batches, and returns their children in the same order.
+    Either way, the result is the same as with sequential calls.
+
+    If `share_key` is given, source nodes with the same key, e.g. `id` for
+    the same object, are assumed to have the same subtree, as in a DAG. The
+    subtree is transformed and laid out once, and each occurrence is a
+    `SharedNode` that is drawn as a copy of it; the root is a `SharedRoot`.
+    Occurrences after the first `max_repeats`, in pre-order, are drawn as
+    a single "(repeated)" box instead. A source graph with a cycle raises ValueError
+    when laid out. Subtrees aren't shared if `max_depth` is 0.
     '''
-    troot = Node.init_with_box(get_val(root), **_box_params)
-    troot.children = [transformed_tree(child, get_val, get_children) for child in get_children(root)]
+    if max_children is not None and max_children < 1:
+        raise ValueError(f'max_children must be at least 1, got {max_children}')
+    adapter = Adapter(get_val, get_children, max_depth, max_children, dict(_box_params), fetch_workers,
+                      get_children_many, share_key, max_repeats, {})
+    if max_depth == 0:
+        troot = LazyNode.init_with_box(get_val(root), **adapter.box_params)
+        # a lazy root isn't a `SharedRoot`, so subtrees aren't shared
+        troot.source, troot.adapter = root, adapter._replace(share_key=None)
+        return troot
+    troot = (Node if share_key is None else SharedRoot).init_with_box(get_val(root), **adapter.box_params)
+    if share_key is not None:
+        adapter.shared[_share_key(adapter, root, 0)] = [troot, None, 1]
+    _transform_children(adapter, root, troot)
     return troot
 
 
-def make_and_print_tree(root: Any, get_val: Callable[[Any], Any], get_children: Callable[[Any], List]):
+def expand(node: Node)->Node:
+    '''
+    transform children of `node` left out by the limits of `transformed_tree`:
+    the children of a `LazyNode`, or the next batch of children
+    summarized by its trailing `MoreNode`. New subtrees are
+    subject to the same limits, relative to `node`.
+    Expanding a `MoreNode` expands its parent, which is returned.
+    The tree must be laid out again afterwards.
+    Expanding a `SharedNode` expands all occurrences of its subtree.
+    Raises ValueError for a `MoreNode` that was already expanded.
+    '''
+    if isinstance(node, MoreNode):
+        more, node = node, node.parent
+        # a copy of the `MoreNode` made for layout has the same batch
+        last = node.children[-1] if node.children else None
+        if not isinstance(last, MoreNode) or last.skip != more.skip:
+            raise ValueError(f'{more.val!r} was already expanded')
+    if isinstance(node, SharedNode):
+        node = node.target
+    if isinstance(node, LazyNode) and node.adapter is not None:
+        adapter, node.adapter = node.adapter, None
+        _transform_children(adapter, node.source, node)
+    elif node.children and isinstance(node.children[-1], MoreNode):
+        more = node.children.pop()
+        _transform_children(more.adapter, more.source, node, more.skip)
+    return node
+
+
+def _fetch_children(adapter: Adapter, source: Any, skip: int)->Tuple[List, int]:
+    '''
+    return children of source from index `skip`, up to the children limit,
+    and the number of remaining children. Remaining children are counted
+    but not transformed.
+    '''
+    return _limit_children(adapter, adapter.get_children(source), skip)
+
+
+def _limit_children(adapter: Adapter, children: Iterable, skip: int)->Tuple[List, int]:
+    '''
+    `_fetch_children`, for already fetched `children`
+    '''
+    if adapter.max_children is None:
+        return list(islice(children, skip, None)), 0
+    remaining = iter(children)
+    batch = list(islice(remaining, skip, skip + adapter.max_children))
+    if hasattr(children, '__len__'):
+        return batch, max(len(children) - skip - len(batch), 0)
+    return batch, sum(1 for _ in remaining)
+
+
+def _transform_children(adapter: Adapter, source: Any, tnode: Node, skip: int=0):
+    '''
+    transform children of source, from index `skip`, and attach them to `tnode`,
+    along with their descendents, up to `max_depth` levels below `tnode`
+    '''
+    start = len(tnode.children)
+    # maps id of shared node to its entry in `adapter.shared`, for the
+    # shared nodes transformed or reached here
+    entries = {}
+    if adapter.fetch_workers is not None or adapter.get_children_many is not None:
+        _transform_levels(adapter, source, tnode, skip, entries)
+    else:
+        _transform_preorder(adapter, source, tnode, skip, entries)
+    if entries:
+        _count_occurrences(adapter, tnode, start, entries)
+
+
+def _transform_preorder(adapter: Adapter, source: Any, tnode: Node, skip: int, entries: dict):
+    '''
+    `_transform_children`, depth-first
+    '''
+    box_params = adapter.box_params
+    # explicit stack so deep trees don't hit the recursion limit
+    stack = [(source, tnode, 0, skip)]
+    while stack:
+        source, tnode, depth, skip = stack.pop()
+        children, remaining = _fetch_children(adapter, source, skip)
+        at_depth_limit = adapter.max_depth is not None and depth + 1 >= adapter.max_depth
+        pending = []
+        for child in children:
+            if adapter.share_key is not None:
+                key = _share_key(adapter, child, depth + 1)
+                if key in adapter.shared:
+                    tnode.children.append(_occurrence(adapter, key, entries))
+                    continue
+            if at_depth_limit:
+                tchild = LazyNode.init_with_box(adapter.get_val(child), **box_params)
+                tchild.source, tchild.adapter = child, adapter
+            else:
+                tchild = Node.init_with_box(adapter.get_val(child), **box_params)
+                pending.append((child, tchild, depth + 1, 0))
+            tnode.children.append(tchild)
+            if adapter.share_key is not None:
+                adapter.shared[key] = entries[id(tchild)] = [tchild, tnode, 0]
+        if remaining:
+            more = MoreNode.init_with_box(f'+{remaining} more', **box_params)
+            more.source, more.adapter, more.skip = source, adapter, skip + len(children)
+            more.parent = tnode
+            tnode.children.append(more)
+        # reversed, so subtrees are transformed in order
+        stack.extend(reversed(pending))
+
+
+def _share_key(adapter: Adapter, source: Any, depth: int)->Any:
+    '''
+    return key of `source`, `depth` levels below the node that's transformed.
+    Under a depth limit, occurrences at different depths are cut at
+    different levels, so they're only shared with the same levels left
+    '''
+    key = adapter.share_key(source)
+    if adapter.max_depth is None:
+        return key
+    return key, adapter.max_depth - depth
+
+
+def _occurrence(adapter: Adapter, key: Any, entries: dict)->SharedNode:
+    '''
+    return `SharedNode` for another occurrence of the already
+    transformed node with share key `key`
+    '''
+    entry = adapter.shared[key]
+    target, parent, _ = entry
+    entries[id(target)] = entry
+    if parent is not None:
+        # the first occurrence is shared from now on
+        parent.children[parent.children.index(target)] = SharedNode(target)
+        entry[1] = None
+    return SharedNode(target)
+
+
+def _count_occurrences(adapter: Adapter, tnode: Node, start: int, entries: dict):
     '''
-    Utility method that transforms and prints tree(s)
+    count occurrences of the shared nodes in `entries` among the children
+    of `tnode` from index `start` and their descendents, in pre-order, so
+    the count doesn't depend on the order they were transformed in.
+    Occurrences past the repeat limit are replaced by reference boxes.
+    A shared subtree is only descended into at its first occurrence
     '''
-    print_tree(transformed_tree(root, get_val, get_children), **_screen_params)
+    # (parent, index of child) still to be visited
+    stack = [(tnode, idx) for idx in range(len(tnode.children) - 1, start - 1, -1)]
+    while stack:
+        parent, idx = stack.pop()
+        node = parent.children[idx]
+        target = node.target if node.__class__ is SharedNode else node
+        entry = entries.get(id(target))
+        if entry is not None:
+            entry[2] += 1
+            if entry[2] > 1:
+                if adapter.max_repeats is not None and entry[2] > adapter.max_repeats:
+                    parent.children[idx] = Node.init_with_box(f'{target.val} (repeated)', **adapter.box_params)
+                continue
+        stack.extend((target, idx) for idx in range(len(target.children) - 1, -1, -1))
+
+
+def _transform_levels(adapter: Adapter, source: Any, tnode: Node, skip: int, entries: dict):
+    '''
+    `_transform_children`, breadth-first: the children, and then their
+    values, of all nodes of a level are fetched together, on a thread pool
+    of `adapter.fetch_workers` threads
+    '''
+    box_params = adapter.box_params
+    workers = adapter.fetch_workers or 1
+    executor = ThreadPoolExecutor(workers) if workers > 1 else None
+    map_func = map if executor is None else executor.map
+    try:
+        # (source, node, skip) of the nodes of the current level
+        level = [(source, tnode, skip)]
+        depth = 0
+        while level:
+            fetched = _fetch_level(adapter, level, map_func, workers)
+            at_depth_limit = adapter.max_depth is not None and depth + 1 >= adapter.max_depth
+            sources = [child for children, _ in fetched for child in children]
+            if adapter.share_key is None:
+                vals = iter(list(map_func(adapter.get_val, sources)))
+            else:
+                # only values of nodes that aren't transformed yet are fetched
+                keys = [_share_key(adapter, child, depth + 1) for child in sources]
+                seen = set(adapter.shared)
+                new = [key not in seen and not seen.add(key) for key in keys]
+                vals = iter(list(map_func(adapter.get_val, [child for child, is_new in zip(sources, new)
+                                                             if is_new])))
+                keys = iter(keys)
+            next_level = []
+            for (source, tnode, skip), (children, remaining) in zip(level, fetched):
+                for child in children:
+                    if adapter.share_key is not None:
+                        key = next(keys)
+                        if key in adapter.shared:
+                            tnode.children.append(_occurrence(adapter, key, entries))
+                            continue
+                    if at_depth_limit:
+                        tchild = LazyNode.init_with_box(next(vals), **box_params)
+                        tchild.source, tchild.adapter = child, adapter
+                    else:
+                        tchild = Node.init_with_box(next(vals), **box_params)
+                        next_level.append((child, tchild, 0))
+                    tnode.children.append(tchild)
+                    if adapter.share_key is not None:
+                        adapter.shared[key] = entries[id(tchild)] = [tchild, tnode, 0]
+                if remaining:
+                    more = MoreNode.init_with_box(f'+{remaining} more', **box_params)
+                    more.source, more.adapter, more.skip = source, adapter, skip + len(children)
+                    more.parent = tnode
+                    tnode.children.append(more)
+            level = next_level
+            depth += 1
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def _fetch_level(adapter: Adapter, level: List[Tuple[Any, Node, int]], map_func: Callable,
+                 workers: int)->List[Tuple[List, int]]:
+    '''
+    `_fetch_children` of each source node of level
+    '''
+    if adapter.get_children_many is None:
+        return list(map_func(lambda item: _fetch_children(adapter, item[0], item[2]), level))
+    sources = [source for source, _, _ in level]
+    size = -(-len(sources) // workers)
+    batches = [sources[start:start + size] for start in range(0, len(sources), size)]
+    child_lists = [children for batch in map_func(adapter.get_children_many, batches) for children in batch]
+    return list(map_func(lambda item: _limit_children(adapter, item[0], item[1][2]), zip(child_lists, level)))
+
+
+def make_and_print_tree(root: Any, get_val: Callable[[Any], Any], get_children: Callable[[Any], Iterable],
+                        **kwargs):
+    '''
+    Utility method that transforms and prints tree(s).
+    `max_depth`, `max_children`, `fetch_workers`, `share_key` and `max_repeats` are
+    passed to `transformed_tree`;
+    they default to values set by `update_param`.
+    `stats`, a `RenderStats`, is passed to `print_tree`, and also
+    records the time taken by `transformed_tree`.
+    `cache`, a `RenderCache`, and `layout` and `workers`, the processes
+    pages are rendered on, are passed to `print_tree`.
+    With `layout='indented'`, the source tree is streamed straight to
+    stdout without being transformed; see `indented.iter_indented`. Only
+    `max_depth` and `max_children` apply to it; other transform params
+    raise TypeError.
+    '''
+    stats = kwargs.pop('stats', None)
+    cache = kwargs.pop('cache', None)
+    screen_params = dict(_screen_params)
+    for name in ('layout', 'workers'):
+        if name in kwargs:
+            screen_params[name] = kwargs.pop(name)
+    if screen_params.get('layout') == 'indented':
+        unsupported = set(kwargs) - {'max_depth', 'max_children'}
+        if unsupported:
+            raise TypeError(f'Unsupported params for the indented layout: {", ".join(sorted(unsupported))}')
+        limits = {name: val for name, val in dict(_transform_params, **kwargs).items()
+                  if name in ('max_depth', 'max_children')}
+        charset = screen_params.get('charset', charsets.Unicode)
+        rows = iter_indented(root, get_val, get_children, charset, **_box_params, **limits)
+        if stats is not None:
+            rows = stats.timed('draw', rows)
+        write_lines(rows, sys.stdout, stats=stats)
+        return
+
+    transform_params = dict(_transform_params, **kwargs)
+    with phase(stats, 'transform'):
+        troot = transformed_tree(root, get_val, get_children, **transform_params)
+    print_tree(troot, stats=stats, cache=cache, **screen_params)
 
 
 def transform_param(param, val):
@@ -60,3 +399,6 @@ def update_param(param: str, new_val):
     if param in BOX_PARAM_NAMES:
         _box_params[param] = new_val
         print(f'{param} updated to {new_val}')
+    if param in TRANSFORM_PARAM_NAMES:
+        _transform_params[param] = new_val
+        print(f'{param} updated to {new_val}')
@@ -0,0 +1,228 @@
+'''
+Persistent layout of a tree that is edited between draws,
+e.g. a live view that is redrawn periodically.
+'''
+from typing import Dict, List, Set
+from .params import MARGIN, LAYOUT
+from .custom_types import Node, AsciiBox, Offset, SharedNode
+from .ascii_tree import preorder, get_node_widths, get_margin, position_nodes, split_tree, update_page_nums, \
+    split_tall_pages
+
+
+class IncrementalLayout:
+    '''
+    Caches widths and positions of the nodes of a tree.
+    The tree must be edited through `set_val`, `add_child` and
+    `remove_child` (or `invalidate` after editing a node directly),
+    which mark the edited nodes dirty. `update` then only recomputes
+    the widths on the paths from dirty nodes to the root, and the
+    positions of the nodes on these paths; subtrees that are unchanged
+    but moved, e.g. siblings to the right of a wider node,
+    are translated as a whole.
+    The result is identical to a fresh `get_node_widths` and
+    `position_nodes`.
+
+    Can be passed to `draw_tree`, `print_tree` and `iter_lines`
+    in place of the root; `margin` of the layout is used.
+    Shared subtrees, i.e. `SharedNode`s of a tree transformed with
+    a `share_key`, aren't supported and raise ValueError.
+    '''
+    def __init__(self, root: Node, margin: int=MARGIN, **box_params):
+        self.root = root
+        self.margin = margin
+        # passed to AsciiBox for new or updated nodes
+        self.box_params = box_params
+        self._parent = {}  # type: Dict[Node, Node]
+        # nodes whose box or children changed
+        self._dirty = set()  # type: Set[Node]
+        # new subtrees, without any position
+        self._unplaced = set()  # type: Set[Node]
+        # whether cached positions were overwritten, e.g. by splitting
+        self._stale = False
+        self._check_unshared(root)
+        self._register(root, None)
+        self.relayout()
+
+    def _register(self, root: Node, parent: Node):
+        '''
+        track parents of nodes of subtree, and create missing boxes
+        '''
+        self._parent[root] = parent
+        for node in preorder(root):
+            if node.box is None:
+                node.box = AsciiBox(node.val, **self.box_params)
+            for child in node.children:
+                self._parent[child] = node
+
+    def _check_unshared(self, root: Node):
+        for node in preorder(root):
+            if node.__class__ is SharedNode:
+                raise ValueError(f'{type(self).__name__} does not support shared subtrees; '
+                                 f'transform the tree without share_key')
+
+    def _unregister(self, root: Node):
+        for node in preorder(root):
+            self._parent.pop(node, None)
+            self._dirty.discard(node)
+            self._unplaced.discard(node)
+
+    def relayout(self):
+        '''
+        compute layout from scratch
+        '''
+        get_node_widths(self.root, self.margin)
+        position_nodes(self.root, 0, 0, self.margin)
+        self._dirty.clear()
+        self._unplaced.clear()
+        self._stale = False
+
+    def set_val(self, node: Node, val):
+        '''
+        update value of node
+        '''
+        node.val = str(val)
+        self.invalidate(node)
+
+    def add_child(self, parent: Node, child: Node, index: int=None):
+        '''
+        add subtree rooted at `child` to `parent`; appended
+        to children if `index` is None, else inserted at `index`
+        '''
+        self._check_unshared(child)
+        if index is None:
+            parent.children.append(child)
+        else:
+            parent.children.insert(index, child)
+        self._register(child, parent)
+        get_node_widths(child, self.margin)
+        self._unplaced.add(child)
+        self._dirty.add(parent)
+
+    def remove_child(self, parent: Node, child: Node):
+        '''
+        remove subtree rooted at `child` from `parent`
+        '''
+        parent.children.remove(child)
+        self._unregister(child)
+        self._dirty.add(parent)
+
+    def invalidate(self, node: Node):
+        '''
+        mark node dirty after its value or children were changed
+        directly; its box is recreated
+        '''
+        node.box = AsciiBox(node.val, **self.box_params)
+        # any child may be new
+        for child in node.children:
+            if child not in self._parent:
+                self._register(child, node)
+                get_node_widths(child, self.margin)
+                self._unplaced.add(child)
+        self._dirty.add(node)
+
+    def _dirty_paths(self)->List[Node]:
+        '''
+        return dirty nodes and their ancestors, deepest first
+        '''
+        depths = {}
+        for node in self._dirty:
+            # walk up until a node whose depth is known
+            path = []
+            while node is not None and node not in depths:
+                path.append(node)
+                node = self._parent[node]
+            depth = -1 if node is None else depths[node]
+            for node in reversed(path):
+                depth += 1
+                depths[node] = depth
+        return sorted(depths, key=depths.__getitem__, reverse=True)
+
+    def update(self):
+        '''
+        bring layout up-to-date with edits
+        '''
+        if self._stale:
+            self.relayout()
+            return
+        if not self._dirty:
+            return
+        margin = self.margin
+        path = self._dirty_paths()
+
+        # widths; children are before parents in path
+        for node in path:
+            box = node.box
+            if node.is_leaf:
+                box.tree_width = box.width
+            else:
+                total_width = sum(child.box.tree_width for child in node.children) + \
+                    get_margin(len(node.children), margin)
+                box.tree_width = max(total_width, box.width)
+
+        # positions; only descend into nodes on a dirty path
+        on_path = set(path)
+        stack = [(self.root, 0, 0, False)]
+        while stack:
+            node, left, top, children_placed = stack.pop()
+            box = node.box
+            if children_placed:
+                # place between first and last child
+                if node.is_leaf:
+                    box.position = Offset(left, top)
+                else:
+                    first = node.children[0].box.position.left
+                    last = node.children[-1].box.position.left
+                    box.position = Offset(left + (last - first) // 2, top)
+                continue
+
+            box.tree_left_offset = left
+            stack.append((node, left, top, True))
+            child_top = top + box.box_height + margin
+            for child in node.children:
+                if child in self._unplaced:
+                    position_nodes(child, left, child_top, margin)
+                elif child in on_path:
+                    stack.append((child, left, child_top, False))
+                else:
+                    self._translate(child, left - child.box.tree_left_offset,
+                                    child_top - child.box.position.top)
+                left += child.box.tree_width + margin
+
+        self._dirty.clear()
+        self._unplaced.clear()
+
+    @staticmethod
+    def _translate(root: Node, dx: int, dy: int):
+        '''
+        move subtree with unchanged layout
+        '''
+        if dx == 0 and dy == 0:
+            return
+        for node in preorder(root):
+            box = node.box
+            box.tree_left_offset += dx
+            box.position = Offset(box.position.left + dx, box.position.top + dy)
+
+    def layout_pages(self, screen_width: int, margin: int=None, screen_height: int=None,
+                     layout: str=LAYOUT, padding: int=None)->List[Node]:
+        '''
+        update layout and return page roots; see `ascii_tree.layout_pages`.
+        Only the boxed layout is supported.
+        '''
+        if layout != 'boxed':
+            raise ValueError(f'{type(self).__name__} does not support the {layout} layout')
+        self.update()
+        if self.root.box.tree_width <= screen_width:
+            pages, page_map = [self.root], {}
+        else:
+            # splitting positions the nodes relative to their pages
+            pages, page_map = split_tree(self.root, max_width=screen_width, margin=self.margin)
+            self._stale = True
+        if screen_height is not None:
+            cut_pages = split_tall_pages(pages, page_map, screen_height, self.margin)
+            if len(cut_pages) != len(pages):
+                # cutting positions the nodes relative to their pages
+                pages = cut_pages
+                self._stale = True
+        update_page_nums(page_map, pages)
+        return pages
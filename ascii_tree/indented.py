@@ -0,0 +1,139 @@
+'''
+Indented layout, like the output of the `tree` command:
+
+    root
+    ├── child
+    │   └── grandchild
+    └── child
+
+Rows are produced in a single depth-first pass that only holds
+the path to the current node, so arbitrarily large trees
+can be streamed.
+'''
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator
+from . import charsets
+from .params import BOX_MAX_WIDTH, PADDING
+from .custom_types import SharedNode, box_dims, wrap_lines
+from .compact import CompactTree
+
+# marks an exhausted iterator
+_END = object()
+
+
+def iter_indented(root: Any, get_val: Callable[[Any], Any]=None, get_children: Callable[[Any], Iterable]=None,
+                  charset=charsets.Unicode, box_max_width: int=BOX_MAX_WIDTH,
+                  padding: int=PADDING, max_depth: int=None, max_children: int=None)->Iterator[str]:
+    '''
+    yield rows of the indented layout of a tree.
+    `root` is a `Node`, a `CompactTree`, or a node of an arbitrary
+    tree described by `get_val` and `get_children`; see
+    `external.transformed_tree`. Children are fetched as they're reached.
+    Labels are wrapped as in a box of `box_max_width`; wrapped lines are
+    aligned with the first line. Nodes that have boxes use
+    their box's line width.
+    As in `transformed_tree`, only `max_depth` levels below root are listed,
+    and children after the first `max_children` are summarized by a
+    "+N more" line.
+    '''
+    if isinstance(root, CompactTree):
+        root, get_val, get_children = 0, root.vals.__getitem__, root.children
+    if get_val is None:
+        # tree of `Node`
+        get_children, get_lines = _node_children, _node_lines
+    else:
+        # as in `box_dims`
+        max_line_width = box_max_width - 2*padding - 2
+
+        def get_lines(node):
+            text = str(get_val(node))
+            if len(text) <= max_line_width:
+                return (text,)
+            return wrap_lines(text, max_line_width)
+
+    if max_children is not None:
+        node_children, node_lines = get_children, get_lines
+
+        def get_children(node):
+            if node.__class__ is _More:
+                return ()
+            return _limit_children(node_children(node), max_children)
+
+        def get_lines(node):
+            if node.__class__ is _More:
+                return (node.text,)
+            return node_lines(node)
+
+    tee = charset.right_out + charset.xside*2 + ' '
+    elbow = charset.bottom_left + charset.xside*2 + ' '
+    pipe = charset.yside + '   '
+    blank = '    '
+
+    for line in get_lines(root):
+        yield line.rstrip()
+    # each entry is (iterator of children, prefix of children, next child, depth of children);
+    # the next child is fetched ahead to know if a child is the last one
+    stack = []
+    children = iter(get_children(root) if max_depth != 0 else ())
+    child = next(children, _END)
+    if child is not _END:
+        stack.append([children, '', child, 1])
+    while stack:
+        frame = stack[-1]
+        children, prefix, node, depth = frame
+        sibling = next(children, _END)
+        if sibling is _END:
+            stack.pop()
+            first_prefix, child_prefix = prefix + elbow, prefix + blank
+        else:
+            frame[2] = sibling
+            first_prefix, child_prefix = prefix + tee, prefix + pipe
+
+        lines = get_lines(node)
+        yield (first_prefix + lines[0]).rstrip()
+        for line in lines[1:]:
+            yield (child_prefix + line).rstrip()
+
+        if max_depth is not None and depth >= max_depth:
+            continue
+        children = iter(get_children(node))
+        child = next(children, _END)
+        if child is not _END:
+            stack.append([children, child_prefix, child, depth + 1])
+
+
+class _More:
+    '''
+    "+N more" line of children left out by the children limit
+    '''
+    __slots__ = ('text',)
+
+    def __init__(self, remaining: int):
+        self.text = f'+{remaining} more'
+
+
+def _limit_children(children: Iterable, max_children: int)->Iterator:
+    '''
+    yield first `max_children` children, followed by a `_More`
+    for the remaining children, if any
+    '''
+    children = iter(children)
+    yield from islice(children, max_children)
+    remaining = sum(1 for _ in children)
+    if remaining:
+        yield _More(remaining)
+
+
+def _node_children(node):
+    # shared subtrees are drawn at each occurrence
+    if node.__class__ is SharedNode:
+        return node.target.children
+    return node.children
+
+
+def _node_lines(node):
+    if node.box is None:
+        _, line_width, _, _ = box_dims(node.val)
+    else:
+        line_width = node.box.line_width
+    return wrap_lines(node.val, line_width)
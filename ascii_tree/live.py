@@ -0,0 +1,138 @@
+'''
+Live rendering of a tree that is redrawn periodically,
+e.g. a job monitor, by only rewriting what changed on the terminal.
+'''
+import sys
+from typing import List, Tuple
+from . import charsets
+from .params import SCREEN_WIDTH, MARGIN, PADDING
+from .ascii_tree import iter_lines
+
+# ANSI escape sequences
+CLEAR_SCREEN = '\x1b[H\x1b[2J'
+CLEAR_LINE_END = '\x1b[K'
+
+# runs of changed cells closer than this are rewritten together,
+# since moving the cursor costs about as much
+MIN_GAP = 8
+
+
+def move_cursor(row: int, col: int)->str:
+    '''
+    escape sequence to move cursor to (0-indexed) row and col
+    '''
+    return f'\x1b[{row+1};{col+1}H'
+
+
+def changed_spans(old: str, new: str, min_gap: int=MIN_GAP)->List[Tuple[int, int]]:
+    '''
+    return (start, end) column ranges, end exclusive, where row `new` differs
+    from row `old`. Rows are compared column by column, i.e. as if padded
+    with spaces to the same width.
+    '''
+    width = max(len(old), len(new))
+    old = old.ljust(width)
+    new = new.ljust(width)
+    spans = []
+    col = 0
+    while col < width:
+        if old[col] == new[col]:
+            col += 1
+            continue
+        start = col
+        while col < width and old[col] != new[col]:
+            col += 1
+        if spans and start - spans[-1][1] < min_gap:
+            spans[-1] = (spans[-1][0], col)
+        else:
+            spans.append((start, col))
+    return spans
+
+
+def diff_frames(old: List[str], new: List[str])->str:
+    '''
+    return escape sequences and text that turn a terminal displaying
+    frame `old` into one displaying frame `new`;
+    each frame is a list of rows drawn from the top-left corner.
+    '''
+    out = []
+    for row in range(max(len(old), len(new))):
+        old_row = old[row] if row < len(old) else ''
+        new_row = new[row] if row < len(new) else ''
+        if old_row == new_row:
+            continue
+        for start, end in changed_spans(old_row, new_row):
+            out.append(move_cursor(row, start))
+            if end >= len(new_row):
+                # rest of the row is blank
+                out.append(new_row[start:])
+                out.append(CLEAR_LINE_END)
+            else:
+                out.append(new_row[start:end])
+    return ''.join(out)
+
+
+class LiveRenderer:
+    '''
+    Draws successive frames of a tree to a terminal stream.
+    The first frame is drawn in full; subsequent frames only rewrite
+    the spans of rows that changed since the previous frame.
+    Tracks bytes written, and bytes a full reprint of each frame
+    would have cost.
+    '''
+    def __init__(self, stream=None, screen_width: int=SCREEN_WIDTH, margin: int=MARGIN,
+                 padding: int=PADDING, charset=charsets.Unicode, encoding: str='utf-8'):
+        self.stream = stream
+        self.screen_width = screen_width
+        self.margin = margin
+        self.padding = padding
+        self.charset = charset
+        self.encoding = encoding
+        # rows of last frame
+        self.frame = None
+        self.frames = 0
+        self.bytes_emitted = 0
+        self.bytes_full = 0
+
+    @property
+    def bytes_saved(self)->int:
+        '''
+        bytes saved compared to full reprints
+        '''
+        return self.bytes_full - self.bytes_emitted
+
+    def render(self, root)->str:
+        '''
+        draw tree; `root` can be anything accepted by `draw_tree`,
+        e.g. an `IncrementalLayout`. Returns the text written.
+        '''
+        lines = list(iter_lines(root, self.screen_width, self.margin, self.padding, self.charset))
+        return self.render_lines(lines)
+
+    def render_lines(self, lines: List[str])->str:
+        '''
+        draw a frame given as rows of text. Returns the text written.
+        '''
+        full = CLEAR_SCREEN + '\n'.join(lines) + '\n'
+        if self.frame is None:
+            out = full
+        else:
+            out = diff_frames(self.frame, lines)
+            if out:
+                # park cursor below frame
+                out += move_cursor(len(lines), 0)
+        self.frame = lines
+        self.frames += 1
+        self.bytes_full += len(full.encode(self.encoding))
+        self.bytes_emitted += len(out.encode(self.encoding))
+
+        stream = self.stream or sys.stdout
+        stream.write(out)
+        stream.flush()
+        return out
+
+    def reset(self):
+        '''
+        draw next frame in full, e.g. after terminal was cleared
+        '''
+        self.frame = None
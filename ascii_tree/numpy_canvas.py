@@ -0,0 +1,220 @@
+'''
+Canvas backend that draws a page into a NumPy array of code points.
+
+Instead of writing cells one run at a time, the cells written by every
+box and edge of a page are computed as whole arrays, for all boxes and
+edges at once. Where the writes of different boxes or edges overlap,
+the one drawn last by `draw.draw_boxes` wins, so the output is identical.
+The page is turned into text with a single decode.
+
+Requires numpy, which is an optional dependency, imported when a page is
+first drawn.
+'''
+from typing import List, Tuple
+from . import charsets
+from .params import PADDING
+from .custom_types import BoxSpec
+from .draw import iter_rows, page_height, page_width
+
+# imported on first use, so importing the package doesn't import numpy
+np = None
+
+
+def _import_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError as exc:
+            raise ImportError("canvas='numpy' requires numpy") from exc
+        np = numpy
+
+
+def render_rows(boxes: List[BoxSpec], edges: List[Tuple[int, int]], width: int, padding: int=PADDING,
+                charset=charsets.Unicode)->List[str]:
+    '''
+    return rendered rows (right stripped) of a page;
+    same as the rows of `draw.iter_rows`
+    '''
+    _import_numpy()
+    names = ('top', 'bottom', 'left', 'right', 'top_left', 'top_right', 'bottom_left', 'bottom_right',
+             'xside', 'yside', 'top_out', 'bottom_out', 'left_out', 'right_out')
+    if any(len(getattr(charset, name)) != 1 for name in names):
+        # a cell can only hold one code point
+        return list(iter_rows(boxes, edges, width, padding=padding, charset=charset))
+    height = page_height(boxes)
+    # a box can stick out past the width the layout assumed
+    width = max(width, page_width(boxes))
+    char = {name: ord(getattr(charset, name)) for name in names}
+
+    writes = _Writes(width, height)
+    _box_writes(writes, boxes, padding, char)
+    if edges:
+        _edge_writes(writes, boxes, edges, char)
+
+    canvas = np.full(height * width, ord(' '), dtype=np.uint32)
+    cells, vals = writes.resolve()
+    canvas[cells] = vals
+    text = canvas.tobytes().decode('utf-32-le', 'surrogatepass')
+    return [text[start:start + width].rstrip() for start in range(0, len(text), width)]
+
+
+class _Writes:
+    '''
+    cells written while drawing a page, with the order they're drawn in.
+    order is (item, step), i.e. the box or edge, and the step within
+    an edge, packed into an int.
+    Writes to rows outside the page are dropped, as by `draw.iter_rows`.
+    '''
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.cells = []
+        self.vals = []
+        self.orders = []
+
+    def add(self, rows, cols, vals, items, step: int=0):
+        '''
+        `items` is an array like `rows`; `vals` is too, or a single value
+        '''
+        self.cells.append(rows * self.width + cols)
+        self.vals.append(vals)
+        self.orders.append(items * 4 + step)
+
+    def resolve(self):
+        '''
+        return cells and their values, keeping the last write of each cell
+        '''
+        cells = np.concatenate(self.cells)
+        vals = np.concatenate([val if isinstance(val, np.ndarray) else np.full(len(cell), val, dtype=np.uint32)
+                               for cell, val in zip(self.cells, self.vals)])
+        orders = np.concatenate(self.orders)
+        # columns are within the page, so only cells of rows outside the page are out of range
+        inside = (cells >= 0) & (cells < self.width * self.height)
+        if not inside.all():
+            cells, vals, orders = cells[inside], vals[inside], orders[inside]
+        idx = np.lexsort((orders, cells))
+        cells, vals = cells[idx], vals[idx]
+        last = np.ones(len(cells), dtype=bool)
+        last[:-1] = cells[1:] != cells[:-1]
+        return cells[last], vals[last]
+
+
+def _ranges(lengths):
+    '''
+    return owner and offset of each element of consecutive ranges
+    of `lengths`; e.g. (0, 0, 2), (0, 1, 0) for lengths 2, 0, 1
+    '''
+    lengths = np.maximum(lengths, 0)
+    owners = np.repeat(np.arange(len(lengths)), lengths)
+    starts = np.cumsum(lengths) - lengths
+    return owners, np.arange(len(owners)) - starts[owners]
+
+
+def _box_writes(writes: _Writes, boxes: List[BoxSpec], padding: int, char: dict):
+    '''
+    cells written by `draw.draw_node` for each box; a box writes
+    each of its cells at most once
+    '''
+    left = np.array([box.left for box in boxes], dtype=np.int64)
+    top = np.array([box.top for box in boxes], dtype=np.int64)
+    box_width = np.array([box.box_width for box in boxes], dtype=np.int64)
+    line_width = np.array([box.line_width for box in boxes], dtype=np.int64)
+    text_len = np.array([len(box.text) for box in boxes], dtype=np.int64)
+    lines = np.where(line_width > 0, -(-text_len // np.maximum(line_width, 1)), 0)
+    right = left + box_width
+    bottom = top + 1 + 2*padding + lines
+
+    # top and bottom borders, with corners
+    owners, offsets = _ranges(box_width + 1)
+    first, last = offsets == 0, offsets == box_width[owners]
+    for rows, (corner_left, side, corner_right) in ((top, ('top_left', 'top', 'top_right')),
+                                                    (bottom, ('bottom_left', 'bottom', 'bottom_right'))):
+        vals = np.where(first, char[corner_left], np.where(last, char[corner_right], char[side]))
+        writes.add(rows[owners], left[owners] + offsets, vals, owners)
+
+    # walls, on padding and text rows
+    owners, offsets = _ranges(2*padding + lines)
+    rows = top[owners] + 1 + offsets
+    writes.add(rows, left[owners], char['left'], owners)
+    writes.add(rows, right[owners], char['right'], owners)
+
+    # padding beside text
+    owners, offsets = _ranges(lines)
+    rows = top[owners] + 1 + padding + offsets
+    for pad in range(padding):
+        writes.add(rows, left[owners] + 1 + pad, ord(' '), owners)
+        writes.add(rows, right[owners] - padding + pad, ord(' '), owners)
+
+    # text, wrapped at line width
+    owners, offsets = _ranges(text_len)
+    if len(owners):
+        text = ''.join(box.text for box in boxes)
+        vals = np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+        line, col = np.divmod(offsets, line_width[owners])
+        writes.add(top[owners] + 1 + padding + line, left[owners] + 1 + padding + col, vals, owners)
+
+
+def _edge_writes(writes: _Writes, boxes: List[BoxSpec], edges: List[Tuple[int, int]], char: dict):
+    '''
+    cells written by `draw.draw_edge_at` for each edge; edges
+    are drawn after all boxes
+    '''
+    src = np.array([src for src, _ in edges], dtype=np.int64)
+    dest = np.array([dest for _, dest in edges], dtype=np.int64)
+    left = np.array([box.left for box in boxes], dtype=np.int64)
+    top = np.array([box.top for box in boxes], dtype=np.int64)
+    box_width = np.array([box.box_width for box in boxes], dtype=np.int64)
+    box_height = np.array([box.box_height for box in boxes], dtype=np.int64)
+    items = len(boxes) + np.arange(len(edges))
+
+    dest_x = left[dest] + box_width[dest] // 2
+    dest_y = top[dest]
+    src_lbound = left[src]
+    src_rbound = left[src] + box_width[src]
+    src_ymiddle = top[src] + box_height[src] // 2
+    src_ybottom = top[src] + box_height[src]
+    from_left = src_lbound > dest_x
+    from_right = ~from_left & (src_rbound < dest_x)
+    from_bottom = ~from_left & ~from_right
+
+    # horizontal legs: from elbow to left protrusion, or from right protrusion to elbow.
+    # legs on the same side of a source share its row and end, so a leg
+    # covers the part of the legs drawn before it that it overlaps; only
+    # the visible part of each leg is written
+    for mask, anchor, sign, (elbow, protrusion) in ((from_left, src_lbound, 1, ('top_left', 'left_out')),
+                                                    (from_right, src_rbound, -1, ('top_right', 'right_out'))):
+        legs = np.flatnonzero(mask)
+        if not len(legs):
+            continue
+        # grouped by source, farthest elbow first, then in draw order
+        legs = legs[np.lexsort((legs, sign * dest_x[legs], src[legs]))]
+        # a leg is visible if it's drawn after the legs farther out from the same source
+        key = src[legs] * len(edges) + legs
+        legs = legs[key == np.maximum.accumulate(key)]
+        # up to the elbow of the next visible leg of the same source
+        same_src = np.zeros(len(legs), dtype=bool)
+        same_src[:-1] = src[legs[1:]] == src[legs[:-1]]
+        next_elbow = np.append(dest_x[legs[1:]], 0)
+        if sign == 1:
+            start, end = dest_x[legs], np.where(same_src, next_elbow - 1, anchor[legs])
+        else:
+            start, end = np.where(same_src, next_elbow + 1, anchor[legs]), dest_x[legs]
+        owners, offsets = _ranges(end - start + 1)
+        cols = start[owners] + offsets
+        legs = legs[owners]
+        vals = np.where(cols == dest_x[legs], char[elbow],
+                        np.where(cols == anchor[legs], char[protrusion], char['xside']))
+        writes.add(src_ymiddle[legs], cols, vals, items[legs])
+
+    # vertical legs, from below the horizontal leg or the source box
+    leg_top = np.where(from_bottom, src_ybottom, src_ymiddle + 1)
+    owners, offsets = _ranges(dest_y - leg_top)
+    writes.add(leg_top[owners] + offsets, dest_x[owners], char['yside'], items[owners], 1)
+
+    # bottom protrusion, on the bottom border of the source box
+    sel = np.flatnonzero(from_bottom)
+    writes.add(src_ybottom[sel] - 1, dest_x[sel], char['bottom_out'], items[sel], 2)
+
+    # every dest box has a top protrusion
+    writes.add(dest_y, dest_x, char['top_out'], items, 3)
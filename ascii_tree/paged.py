@@ -0,0 +1,65 @@
+'''
+Random access to the pages of a tree, e.g. for a viewer that
+shows one page at a time.
+'''
+from typing import List
+from . import charsets
+from .params import SCREEN_WIDTH, SCREEN_HEIGHT, LAYOUT, CANVAS, MARGIN, PADDING
+from .ascii_tree import layout_pages, flatten_page, position_nodes, check_canvas
+from .draw import iter_rows
+from .stats import RenderStats, phase
+from . import numpy_canvas
+
+
+class PagedTree:
+    '''
+    Pages of a tree, rendered on demand by index.
+    The tree is split into pages, and the "Cont. on page" numbers are
+    filled in, up front; this is the cheap part of the layout. Pages split
+    by width are only positioned when they're first rendered, and a page
+    is drawn each time it's rendered, so rendering page k doesn't draw
+    the pages before it. The rows of page k are the same as those
+    of page k in the output of `print_tree`, without the page header.
+
+    `root` can be anything accepted by `layout_pages`; the tree
+    must not be changed while it's paged.
+    '''
+    def __init__(self, root, screen_width: int=SCREEN_WIDTH, margin: int=MARGIN, padding: int=PADDING,
+                 charset=charsets.Unicode, stats: RenderStats=None, screen_height: int=SCREEN_HEIGHT,
+                 layout: str=LAYOUT, canvas: str=CANVAS):
+        check_canvas(canvas)
+        self.screen_width = screen_width
+        self.margin = margin
+        self.padding = padding
+        self.charset = charset
+        self.stats = stats
+        self.canvas = canvas
+        # pages still to be positioned
+        self._unpositioned = set()
+        self.pages = layout_pages(root, screen_width, margin, stats, screen_height, layout,
+                                  unpositioned=self._unpositioned, padding=padding)
+
+    def __len__(self):
+        return len(self.pages)
+
+    def page_rows(self, index: int)->List[str]:
+        '''
+        return rendered rows (right stripped) of page `index`;
+        negative indices count from the last page
+        '''
+        page = self.pages[index]
+        if page in self._unpositioned:
+            with phase(self.stats, 'position'):
+                position_nodes(page, 0, 0, self.margin)
+            self._unpositioned.discard(page)
+        boxes, edges = flatten_page(page, self.stats)
+        with phase(self.stats, 'draw'):
+            if self.canvas == 'numpy':
+                return numpy_canvas.render_rows(boxes, edges, self.screen_width, self.padding, self.charset)
+            return list(iter_rows(boxes, edges, self.screen_width, padding=self.padding, charset=self.charset))
+
+    def render_page(self, index: int)->str:
+        '''
+        return page `index` as a string
+        '''
+        return '\n'.join(self.page_rows(index))
@@ -0,0 +1,72 @@
+'''
+Rendering the pages of a split tree on a pool of processes.
+
+Pages are independent once page numbers are filled in, so each one
+is sent to a worker as plain tuples of box and edge data
+and rendered there; rows are gathered in page order.
+'''
+import os
+from array import array
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Iterator, List, Tuple
+from . import charsets
+from .params import PADDING, PARALLEL_MIN_PAGES
+from .custom_types import BoxSpec
+from .draw import iter_rows
+
+
+def pack_page(boxes: List[BoxSpec], edges: List[Tuple[int, int]])->tuple:
+    '''
+    compact, picklable form of a flattened page:
+    boxes as plain tuples and edges as a flat array of (src, dest) indices
+    '''
+    flat_edges = array('i')
+    for src, dest in edges:
+        flat_edges.append(src)
+        flat_edges.append(dest)
+    return tuple(tuple(box) for box in boxes), flat_edges
+
+
+def unpack_page(packed: tuple)->Tuple[List[BoxSpec], List[Tuple[int, int]]]:
+    '''
+    inverse of `pack_page`
+    '''
+    boxes, flat_edges = packed
+    return [BoxSpec(*box) for box in boxes], list(zip(flat_edges[::2], flat_edges[1::2]))
+
+
+def render_packed(packed: tuple, width: int, padding: int=PADDING, charset=charsets.Unicode)->List[str]:
+    '''
+    render rows of a packed page; runs in a worker
+    '''
+    boxes, edges = unpack_page(packed)
+    return list(iter_rows(boxes, edges, width, padding=padding, charset=charset))
+
+
+def _render_job(job: tuple)->List[str]:
+    return render_packed(*job)
+
+
+def render_pages(pages: List[tuple], width: int, padding: int=PADDING, charset=charsets.Unicode,
+                 workers: int=None, executor: Executor=None)->Iterator[List[str]]:
+    '''
+    yield rows of each flattened page, i.e. (boxes, edges), in page order.
+    Pages are rendered on `executor`, or on a pool of `workers` processes
+    (all cores if None). Fewer than `PARALLEL_MIN_PAGES` pages, or a single
+    worker, are rendered in this process since starting workers and
+    shipping pages would cost more than it saves.
+    '''
+    if executor is None and (len(pages) < PARALLEL_MIN_PAGES or workers == 1):
+        for boxes, edges in pages:
+            yield list(iter_rows(boxes, edges, width, padding=padding, charset=charset))
+        return
+
+    jobs = [(pack_page(boxes, edges), width, padding, charset) for boxes, edges in pages]
+    if executor is not None:
+        yield from executor.map(_render_job, jobs)
+        return
+    workers = workers or os.cpu_count() or 1
+    # a few pages per task, to amortize the round trips
+    chunksize = max(1, len(jobs) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(_render_job, jobs, chunksize=chunksize)
@@ -1,5 +1,15 @@
 SCREEN_WIDTH = 180
+SCREEN_HEIGHT = None  # maximum page height; None for no limit
+LAYOUT = 'boxed'  # 'boxed', 'tidy' (subtrees nested closer together), or 'indented' (`tree` command like)
 MARGIN = 5  # space between nodes
 PADDING = 1  # space between node body and node walls
 BOX_MAX_WIDTH = 30  # maximum width of ascii box
 SHOW_CONT_DIALOG = True
+BOX_CACHE_SIZE = 4096  # number of distinct box texts whose metrics are cached
+PARALLEL_MIN_PAGES = 8  # fewer pages than this are rendered serially
+WRITE_CHUNK_LINES = 1024  # lines joined into a single write when printing
+ASYNC_BATCH_LINES = 256  # lines rendered between returns to the event loop
+RENDER_CACHE_SIZE = 128  # rendered outputs kept by a RenderCache
+CANVAS = 'list'  # 'list', or 'numpy' to draw each page with numpy (requires numpy)
+VIEWPORT_CELL_WIDTH = 64  # columns of a grid cell of a Viewport's spatial index
+VIEWPORT_CELL_HEIGHT = 32  # rows of a grid cell of a Viewport's spatial index
@@ -0,0 +1,115 @@
+'''
+Layouts that are computed once and saved, e.g. to render a large
+tree many times with different charsets or to different outputs.
+
+A `SavedLayout` holds the flattened pages of a laid out tree, i.e. the
+text, position and dimensions of each box and the edges of each page,
+which is all that's needed to draw it. It's saved as JSON, with a format
+version, and can be loaded and drawn without the source tree.
+'''
+import json
+import os
+from typing import Iterator, List, Tuple
+from . import charsets
+from .params import SCREEN_WIDTH, SCREEN_HEIGHT, LAYOUT, CANVAS, MARGIN, PADDING
+from .custom_types import BoxSpec
+from .ascii_tree import layout_pages, flatten_page, iter_page_lines
+from .stats import RenderStats
+
+# version of the saved format; layouts saved with another version are rejected
+LAYOUT_VERSION = 1
+
+
+class SavedPage:
+    '''
+    flattened page of a `SavedLayout`; can be drawn like a laid out page
+    '''
+    __slots__ = ('boxes', 'edges')
+
+    def __init__(self, boxes: List[BoxSpec], edges: List[Tuple[int, int]]):
+        self.boxes = boxes
+        self.edges = edges
+
+    def flatten(self)->Tuple[List[BoxSpec], List[Tuple[int, int]]]:
+        return self.boxes, self.edges
+
+
+class SavedLayout:
+    '''
+    Pages of a tree, laid out with the given params.
+    Can be passed to `print_tree`, `iter_lines` etc. in place of the
+    root, with the same `screen_width`, `margin`, `screen_height`,
+    `layout` and `padding`, so layout is skipped.
+    '''
+    def __init__(self, pages: List[SavedPage], screen_width: int=SCREEN_WIDTH, margin: int=MARGIN,
+                 padding: int=PADDING, screen_height: int=SCREEN_HEIGHT, layout: str=LAYOUT):
+        self.pages = pages
+        self.screen_width = screen_width
+        self.margin = margin
+        self.padding = padding
+        self.screen_height = screen_height
+        self.layout = layout
+
+    @classmethod
+    def from_tree(cls, root, screen_width: int=SCREEN_WIDTH, margin: int=MARGIN, padding: int=PADDING,
+                  screen_height: int=SCREEN_HEIGHT, layout: str=LAYOUT, stats: RenderStats=None)->'SavedLayout':
+        '''
+        lay out `root`, anything accepted by `layout_pages`
+        '''
+        pages = [SavedPage(*flatten_page(page, stats))
+                 for page in layout_pages(root, screen_width, margin, stats, screen_height, layout, padding=padding)]
+        return cls(pages, screen_width, margin, padding, screen_height, layout)
+
+    def layout_pages(self, screen_width: int, margin: int, screen_height: int, layout: str=LAYOUT,
+                     padding: int=PADDING)->List[SavedPage]:
+        '''
+        pages laid out with the given params; see `ascii_tree.layout_pages`.
+        Raises ValueError if they aren't the params the layout was saved with
+        '''
+        params = (screen_width, margin, screen_height, layout, padding)
+        if params != (self.screen_width, self.margin, self.screen_height, self.layout, self.padding):
+            raise ValueError(f'Layout was saved with screen_width={self.screen_width}, margin={self.margin}, '
+                             f'screen_height={self.screen_height}, layout={self.layout!r}, '
+                             f'padding={self.padding}')
+        return self.pages
+
+    def iter_lines(self, charset=charsets.Unicode, workers: int=1, stats: RenderStats=None,
+                   canvas: str=CANVAS)->Iterator[str]:
+        '''
+        yield the lines of output of `print_tree`, drawn with `charset`
+        '''
+        return iter_page_lines(self.pages, self.screen_width, self.padding, charset, workers, stats, canvas)
+
+    def to_json(self)->str:
+        params = {'version': LAYOUT_VERSION, 'screen_width': self.screen_width, 'margin': self.margin,
+                  'padding': self.padding, 'screen_height': self.screen_height, 'layout': self.layout}
+        # boxes are stored as lists of fields, in `BoxSpec` order
+        params['pages'] = [{'boxes': [list(box) for box in page.boxes], 'edges': [list(edge) for edge in page.edges]}
+                           for page in self.pages]
+        return json.dumps(params, separators=(',', ':'), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text: str)->'SavedLayout':
+        '''
+        Raises ValueError if the layout was saved with another version
+        '''
+        params = json.loads(text)
+        version = params.pop('version', None) if isinstance(params, dict) else None
+        if version != LAYOUT_VERSION:
+            raise ValueError(f'Layout version {version} is not supported (expected {LAYOUT_VERSION}); '
+                             f'lay out the tree again')
+        pages = [SavedPage([BoxSpec(*box) for box in page['boxes']], [tuple(edge) for edge in page['edges']])
+                 for page in params.pop('pages')]
+        return cls(pages, **params)
+
+    def save(self, path: str):
+        # written under a temporary name, so readers never see a partial layout
+        temp = f'{path}.{os.getpid()}.tmp'
+        with open(temp, 'w', encoding='utf-8') as fp:
+            fp.write(self.to_json())
+        os.replace(temp, path)
+
+    @classmethod
+    def load(cls, path: str)->'SavedLayout':
+        with open(path, encoding='utf-8') as fp:
+            return cls.from_json(fp.read())
@@ -0,0 +1,128 @@
+'''
+Layout of trees with shared subtrees, i.e. with `SharedNode`s.
+
+Each distinct shared subtree is laid out once, at the origin, and
+occurrences are laid out as leaves as big as the subtree. `draw.flatten`
+draws each occurrence as a copy of the subtree, translated to the
+occurrence's offset, so the output is the same as that of the tree
+with every occurrence copied, while layout time and memory depend on
+the distinct subtrees.
+Occurrences are leaves, so traversals such as `preorder` don't
+descend into shared subtrees. Occurrences that are copied for layout
+are copied in a private copy of the tree; the caller's tree keeps
+its occurrences.
+'''
+from copy import copy
+from .params import MARGIN
+from .custom_types import Node, SharedNode
+from .ascii_tree import get_node_widths, position_nodes, preorder
+
+
+def prepare_shared(root: Node, margin: int=MARGIN, max_width: int=None, expand_all: bool=False)->Node:
+    '''
+    lay out the subtrees shared by `SharedNode`s in tree rooted at `root`,
+    and set the size of each occurrence. Occurrences wider than `max_width`,
+    which would be split, or all occurrences if `expand_all`, e.g. for the
+    tidy layout or pages of limited height, are replaced by copies of
+    their subtree.
+    Returns root of the tree to lay out: `root`, or a copy of it if
+    occurrences are replaced, so the caller's tree is left as is.
+    Raises ValueError if shared subtrees contain each other.
+    '''
+    heights = {}
+    for target in _targets(root):
+        # nested occurrences are laid out first
+        nodes = preorder(target)
+        for node in nodes:
+            if node.__class__ is SharedNode:
+                node.subtree_height = heights[node.target]
+        get_node_widths(target, margin)
+        position_nodes(target, 0, 0, margin)
+        heights[target] = max(node.box.position.top + node.box.box_height for node in nodes)
+
+    def expands(node):
+        node.subtree_height = heights[node.target]
+        return expand_all or (max_width is not None and node.width > max_width)
+
+    # a list, so every occurrence is sized
+    if not any([expands(node) for node in preorder(root) if node.__class__ is SharedNode]):
+        return root
+
+    root = _copy_subtree(root)
+    # occurrences in the tree, with their parents
+    pending = [(parent, child) for parent in preorder(root) for child in parent.children
+               if child.__class__ is SharedNode]
+    while pending:
+        parent, node = pending.pop()
+        if expands(node):
+            clone = _copy_subtree(node.target)
+            parent.children[parent.children.index(node)] = clone
+            pending.extend((cparent, child) for cparent in preorder(clone) for child in cparent.children
+                           if child.__class__ is SharedNode)
+    return root
+
+
+def _targets(root: Node)->list:
+    '''
+    return subtrees shared by occurrences in tree rooted at `root`, such
+    that a subtree comes after the subtrees shared by occurrences in it
+    '''
+    order = []
+    # maps subtree to whether it's done, i.e. False while its
+    # nested subtrees are visited
+    done = {}
+
+    def nested(node):
+        return iter([child.target for child in preorder(node) if child.__class__ is SharedNode])
+
+    stack = [(None, nested(root))]
+    while stack:
+        target, pending = stack[-1]
+        child = next(pending, None)
+        if child is None:
+            stack.pop()
+            if target is not None:
+                done[target] = True
+                order.append(target)
+        elif child not in done:
+            done[child] = False
+            stack.append((child, nested(child)))
+        elif not done[child]:
+            raise ValueError(f'Shared subtree {child.val} contains itself')
+    return order
+
+
+def _copy_subtree(root: Node)->Node:
+    '''
+    copy nodes of tree rooted at `root`; occurrences
+    in it are copied as occurrences
+    '''
+    clone = _copy_node(root)
+    stack = [(root, clone)]
+    while stack:
+        node, node_clone = stack.pop()
+        for child in node.children:
+            if child.__class__ is SharedNode:
+                child_clone = SharedNode(child.target)
+            else:
+                child_clone = _copy_node(child)
+                stack.append((child, child_clone))
+            node_clone.children.append(child_clone)
+    return clone
+
+
+def _copy_node(node: Node)->Node:
+    '''
+    copy `node` with its box copied and empty children. Unlike `copy`,
+    keeps the class of the node and its other attributes, e.g. the
+    source of a `LazyNode`, so the copy can stand in for it
+    '''
+    cls = node.__class__
+    clone = cls.__new__(cls)
+    for klass in cls.__mro__:
+        for name in getattr(klass, '__slots__', ()):
+            if hasattr(node, name):
+                setattr(clone, name, getattr(node, name))
+    clone.children = []
+    clone.box = copy(node.box)
+    return clone
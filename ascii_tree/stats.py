@@ -0,0 +1,126 @@
+'''
+Instrumentation of rendering: time spent per phase and
+counts of what was drawn and written.
+'''
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Iterable, Iterator, List, Tuple
+from .custom_types import BoxSpec
+
+# shared context for disabled stats
+_NO_STATS = nullcontext()
+# marks end of an iterator
+_END = object()
+
+
+class RenderStats:
+    '''
+    Collects statistics of a render; pass it as `stats` to
+    `draw_tree`, `iter_lines`, `print_tree` or `make_and_print_tree`.
+    `timings` maps phase name to wall time in seconds. Phases are:
+    transform (`transformed_tree`), widths (`get_node_widths`),
+    split (`split_tree`), position (`position_nodes`), layout (objects that
+    lay themselves out), flatten, screen (screen allocation),
+    draw (`draw_node`/`draw_edge`), cache (render cache lookup) and write.
+    `on_phase(name, elapsed)` is called at the end of each timed phase.
+    '''
+    def __init__(self, on_phase: Callable[[str, float], None]=None):
+        self.on_phase = on_phase
+        self.timings = {}
+        self.nodes = 0
+        self.edges = 0
+        self.pages = 0
+        # non blank cells of output
+        self.cells = 0
+        self.lines = 0
+        self.bytes_emitted = 0
+
+    def add_time(self, name: str, elapsed: float):
+        self.timings[name] = self.timings.get(name, 0.0) + elapsed
+        if self.on_phase is not None:
+            self.on_phase(name, elapsed)
+
+    @contextmanager
+    def phase(self, name: str):
+        '''
+        time the enclosed block as phase `name`
+        '''
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def timed(self, name: str, items: Iterable)->Iterator:
+        '''
+        yield from `items`, timing their production as phase `name`.
+        The phase ends, i.e. its time is added, when `items` is
+        exhausted or the iterator is closed
+        '''
+        items = iter(items)
+        elapsed = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                item = next(items, _END)
+                elapsed += time.perf_counter() - start
+                if item is _END:
+                    return
+                yield item
+        finally:
+            self.add_time(name, elapsed)
+
+    def count_page(self, boxes: List[BoxSpec], edges: List[Tuple[int, int]]):
+        self.pages += 1
+        self.nodes += len(boxes)
+        self.edges += len(edges)
+
+    def count_row(self, row: str):
+        '''
+        count non blank cells of a rendered row
+        '''
+        self.cells += len(row) - row.count(' ')
+
+    def count_screen(self, screen: List[List[str]]):
+        '''
+        count non blank cells of a drawn screen
+        '''
+        self.cells += sum(len(row) - row.count(' ') for row in screen)
+
+    def count_written(self, lines: int, nbytes: int):
+        '''
+        count lines written, and their size in bytes
+        '''
+        self.lines += lines
+        self.bytes_emitted += nbytes
+
+    @property
+    def total_time(self)->float:
+        return sum(self.timings.values())
+
+    def as_dict(self)->dict:
+        return {
+            'timings': dict(self.timings),
+            'nodes': self.nodes,
+            'edges': self.edges,
+            'pages': self.pages,
+            'cells': self.cells,
+            'lines': self.lines,
+            'bytes_emitted': self.bytes_emitted,
+        }
+
+    def __str__(self):
+        lines = [f'{name:<10} {elapsed*1000:>10.2f} ms' for name, elapsed in self.timings.items()]
+        lines.append(f'{"total":<10} {self.total_time*1000:>10.2f} ms')
+        lines.append(f'nodes: {self.nodes}, edges: {self.edges}, pages: {self.pages}, '
+                     f'cells: {self.cells}, lines: {self.lines}, bytes: {self.bytes_emitted}')
+        return '\n'.join(lines)
+
+
+def phase(stats: RenderStats, name: str):
+    '''
+    context timing phase `name` if stats are enabled, else a no-op
+    '''
+    if stats is None:
+        return _NO_STATS
+    return stats.phase(name)
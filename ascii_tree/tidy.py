@@ -0,0 +1,129 @@
+'''
+Tidy tree layout, in the style of Reingold-Tilford.
+
+`position_nodes` gives every subtree the full rectangle of its
+`tree_width`, so a narrow node with a wide subtree far below it blocks
+the whole strip. Here, subtrees are described by their contours, i.e.
+the leftmost and rightmost column occupied on each level, and siblings
+are pushed only as close together as their contours allow; e.g. the
+children of a node may extend below a leaf sibling.
+
+Nodes at the same depth are placed on the same rows, so contours can
+be compared level by level. The contour of a level includes the edges
+leaving it, so edges don't cross boxes of nested subtrees.
+'''
+from .params import MARGIN
+from .custom_types import Offset
+
+
+def tidy_layout(root, margin: int=MARGIN, left_offset: int=0, top_offset: int=0)->int:
+    '''
+    compute position, tree_left_offset and tree_width of each node
+    of tree rooted at `root`, in place; `tree_width` is the width of the
+    tidy layout of the subtree. A parent is placed between its first
+    and last child, like `position_nodes`.
+    Takes time linear in the number of nodes.
+    Returns width of tree.
+    '''
+    # pre-order, with depths
+    order = []
+    depths = []
+    stack = [(root, 0)]
+    while stack:
+        node, depth = stack.pop()
+        order.append(node)
+        depths.append(depth)
+        stack.extend((child, depth + 1) for child in reversed(node.children))
+    index = {node: idx for idx, node in enumerate(order)}
+
+    # rows of each level are as tall as its tallest box
+    level_heights = []
+    for node, depth in zip(order, depths):
+        if depth == len(level_heights):
+            level_heights.append(0)
+        level_heights[depth] = max(level_heights[depth], node.box.box_height)
+    level_tops = [top_offset]
+    for height in level_heights:
+        level_tops.append(level_tops[-1] + height + margin)
+
+    count = len(order)
+    # left of box, relative to the node's subtree
+    lefts = [0]*count
+    # shift of a subtree relative to its parent's subtree
+    shifts = [0]*count
+    # extent of subtree, relative to the subtree
+    subtree_lo = [0]*count
+    subtree_hi = [0]*count
+    # contour of each laid out subtree that's not yet merged into its parent:
+    # (left contour, its offset, right contour, its offset);
+    # contours list the levels bottom-up, so the level of the subtree root is last
+    # and a parent appends its level. Offsets allow shifting a contour in
+    # constant time.
+    contours = [None]*count
+
+    # post-order: lay out children, then place parent between them
+    for idx in range(count - 1, -1, -1):
+        node = order[idx]
+        box_width = node.box.box_width
+        if not node.children:
+            subtree_hi[idx] = box_width
+            contours[idx] = ([0], 0, [box_width], 0)
+            continue
+
+        children = [index[child] for child in node.children]
+        first = children[0]
+        left_contour, left_base, right_contour, right_base = contours[first]
+        contours[first] = None
+        lo, hi = subtree_lo[first], subtree_hi[first]
+        for child in children[1:]:
+            child_left, child_left_base, child_right, child_right_base = contours[child]
+            contours[child] = None
+            # push child right until it clears the siblings on every common level
+            gap = right_base + margin - child_left_base
+            shift = right_contour[-1] + gap - child_left[-1]
+            for level in range(2, min(len(right_contour), len(child_left)) + 1):
+                shift = max(shift, right_contour[-level] + gap - child_left[-level])
+            shifts[child] = shift
+            child_left_base += shift
+            child_right_base += shift
+            lo = min(lo, subtree_lo[child] + shift)
+            hi = max(hi, subtree_hi[child] + shift)
+            # merge contours; only the common levels are touched
+            if len(child_left) > len(left_contour):
+                # child is deeper; it continues the left contour
+                for level in range(1, len(left_contour) + 1):
+                    child_left[-level] = left_contour[-level] + left_base - child_left_base
+                left_contour, left_base = child_left, child_left_base
+                right_contour, right_base = child_right, child_right_base
+            else:
+                for level in range(1, len(child_right) + 1):
+                    right_contour[-level] = child_right[-level] + child_right_base - right_base
+
+        first_left = lefts[first]
+        last_left = lefts[children[-1]] + shifts[children[-1]]
+        left = first_left + (last_left - first_left) // 2
+        lefts[idx] = left
+        # level of node covers its box and the edges to its children,
+        # which enter the middle of the children
+        level_lo = min(left, first_left + order[first].box.box_width // 2)
+        level_hi = max(left + box_width, last_left + order[children[-1]].box.box_width // 2)
+        left_contour.append(level_lo - left_base)
+        right_contour.append(level_hi - right_base)
+        subtree_lo[idx] = min(lo, level_lo)
+        subtree_hi[idx] = max(hi, level_hi)
+        contours[idx] = (left_contour, left_base, right_contour, right_base)
+
+    # pre-order: accumulate shifts into absolute positions,
+    # such that the leftmost column of the tree is at left_offset
+    origins = [0]*count
+    origins[0] = left_offset - subtree_lo[0]
+    for idx, node in enumerate(order):
+        origin = origins[idx]
+        for child in node.children:
+            child_idx = index[child]
+            origins[child_idx] = origin + shifts[child_idx]
+        box = node.box
+        box.position = Offset(origin + lefts[idx], level_tops[depths[idx]])
+        box.tree_left_offset = origin + subtree_lo[idx]
+        box.tree_width = subtree_hi[idx] - subtree_lo[idx]
+    return root.box.tree_width
@@ -0,0 +1,277 @@
+'''
+Rendering rectangles of one unpaginated layout of a tree, i.e. of
+a virtual canvas, e.g. for panning over a very large tree.
+
+Boxes and edges are bucketed into a grid of cells over the canvas, so
+a rectangle is drawn with only the boxes and edges in the cells it
+overlaps, in the same order as `draw.draw_boxes`, clipped to the rectangle.
+The output is the same as that part of the whole canvas.
+
+Horizontal legs of the edges on the same side of a box share a row and
+an end, so they overlap, and can be as wide as the canvas. They're
+grouped per box and side rather than indexed per edge, and groups are
+looked up by row rather than by cell, so wide legs don't fill many cells.
+Only the legs that are visible in a rectangle, i.e. drawn last at some
+column of it, are drawn.
+'''
+import sys
+from bisect import bisect_left, bisect_right
+from typing import Iterator, List, Optional
+from . import charsets
+from .params import MARGIN, PADDING, LAYOUT, VIEWPORT_CELL_WIDTH, VIEWPORT_CELL_HEIGHT
+from .custom_types import BoxSpec
+from .ascii_tree import layout_pages, flatten_page
+from .draw import draw_node, page_height, page_width
+
+# side of the source box an edge leaves from
+_LEFT, _RIGHT, _BOTTOM = -1, 1, 0
+
+
+class Viewport:
+    '''
+    Tree laid out on a single virtual canvas, `width` x `height`,
+    with a spatial index of its boxes and edges.
+    `root` can be anything accepted by `layout_pages`; the tree
+    must not be changed while it's viewed.
+    '''
+    def __init__(self, root, margin: int=MARGIN, padding: int=PADDING, charset=charsets.Unicode,
+                 layout: str=LAYOUT, cell_width: int=VIEWPORT_CELL_WIDTH,
+                 cell_height: int=VIEWPORT_CELL_HEIGHT):
+        self.padding = padding
+        self.charset = charset
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        # wide enough that the tree isn't split
+        page, = layout_pages(root, sys.maxsize, margin, layout=layout, padding=padding)
+        self.boxes, self.edges = flatten_page(page)
+        self.width = page_width(self.boxes)
+        self.height = page_height(self.boxes)
+        # maps cell to indices of boxes, and of edges without
+        # their horizontal legs, in it
+        self._box_cells = {}
+        self._edge_cells = {}
+        # (side, dest columns, edge per dest column) of each group of legs;
+        # see `_visible_legs`
+        self._legs = []
+        # maps row to (left ends, right ends, running max of right ends, group)
+        # of its groups of legs, sorted by left end
+        self._leg_rows = {}
+        self._index()
+
+    def _index(self):
+        for idx, box in enumerate(self.boxes):
+            self._add(self._box_cells, idx, box.left, box.top, box.left + box.box_width,
+                      box.top + box.box_height - 1)
+        groups = {}
+        rows = {}
+        for idx, (src, dest) in enumerate(self.edges):
+            side, row, anchor, dest_x, dest_y, leg_top = _edge_geometry(self.boxes[src], self.boxes[dest])
+            self._add(self._edge_cells, idx, dest_x, min(leg_top, dest_y), dest_x, dest_y)
+            if side != _BOTTOM:
+                groups.setdefault((src, side, row, anchor), []).append((dest_x, idx))
+        for (src, side, row, anchor), legs in groups.items():
+            legs.sort()
+            xs = [dest_x for dest_x, _ in legs]
+            # edge drawn last at a column, of the legs up to (left side)
+            # or from (right side) each leg
+            winners = [idx for _, idx in legs]
+            order = range(1, len(legs)) if side == _LEFT else range(len(legs) - 2, -1, -1)
+            prev = winners[0] if side == _LEFT else winners[-1]
+            for pos in order:
+                prev = winners[pos] = max(prev, winners[pos])
+            rows.setdefault(row, []).append((min(xs[0], anchor), max(xs[-1], anchor), len(self._legs)))
+            self._legs.append((side, xs, winners))
+        for row, spans in rows.items():
+            spans.sort()
+            right_ends = []
+            for _, right, _ in spans:
+                right_ends.append(max(right, right_ends[-1]) if right_ends else right)
+            self._leg_rows[row] = ([left for left, _, _ in spans], [right for _, right, _ in spans], right_ends,
+                                   [group for _, _, group in spans])
+
+    def _add(self, cells: dict, idx: int, left: int, top: int, right: int, bottom: int):
+        '''
+        add item `idx` to the cells overlapping the
+        rectangle, with inclusive bounds
+        '''
+        for cell_y in range(top // self.cell_height, bottom // self.cell_height + 1):
+            for cell_x in range(left // self.cell_width, right // self.cell_width + 1):
+                cell = (cell_x, cell_y)
+                if cell in cells:
+                    cells[cell].append(idx)
+                else:
+                    cells[cell] = [idx]
+
+    def _query(self, cells: dict, left: int, top: int, right: int, bottom: int)->set:
+        found = set()
+        for cell_y in range(top // self.cell_height, bottom // self.cell_height + 1):
+            for cell_x in range(left // self.cell_width, right // self.cell_width + 1):
+                found.update(cells.get((cell_x, cell_y), ()))
+        return found
+
+    def _leg_groups(self, left: int, top: int, right: int, bottom: int)->Iterator[int]:
+        '''
+        yield groups of legs that overlap the rectangle
+        '''
+        for row in range(top, bottom + 1):
+            if row not in self._leg_rows:
+                continue
+            lefts, rights, right_ends, groups = self._leg_rows[row]
+            # groups that start left of the rectangle's right, back to
+            # where none of them reach the rectangle's left
+            pos = bisect_right(lefts, right) - 1
+            while pos >= 0 and right_ends[pos] >= left:
+                if rights[pos] >= left:
+                    yield groups[pos]
+                pos -= 1
+
+    def _visible_legs(self, group: int, left: int, right: int)->set:
+        '''
+        edges whose horizontal leg of `group` is drawn last
+        at some column from `left` to `right`
+        '''
+        side, xs, winners = self._legs[group]
+        if side == _LEFT:
+            # legs whose elbow is left of a column cover it
+            start, end = bisect_right(xs, left), bisect_right(xs, right)
+            return set(winners[max(start - 1, 0):end])
+        start, end = bisect_left(xs, left), bisect_left(xs, right)
+        return set(winners[start:end + 1])
+
+    def render_viewport(self, x: int, y: int, w: int, h: int)->List[str]:
+        '''
+        return the `h` rows of `w` columns of the canvas,
+        from column `x` and row `y`
+        '''
+        rows = [[' ']*w for _ in range(h)]
+        if w <= 0 or h <= 0:
+            return [''.join(row) for row in rows]
+        right, bottom = x + w - 1, y + h - 1
+        screen = _Window(rows, x, y)
+        for idx in sorted(self._query(self._box_cells, x, y, right, bottom)):
+            box = self.boxes[idx]
+            draw_node(screen, box.text, box.left, box.top, box.box_width, box.line_width,
+                      self.padding, self.charset)
+        edges = self._query(self._edge_cells, x, y, right, bottom)
+        for group in self._leg_groups(x, y, right, bottom):
+            edges |= self._visible_legs(group, x, right)
+        for idx in sorted(edges):
+            src, dest = self.edges[idx]
+            _draw_edge_clipped(screen, self.boxes[src], self.boxes[dest], self.charset)
+        return [''.join(row) for row in rows]
+
+    def node_at(self, x: int, y: int)->Optional[BoxSpec]:
+        '''
+        return the box of the node drawn at column `x` and row `y`, or None
+        '''
+        found = None
+        for idx in self._query(self._box_cells, x, y, x, y):
+            box = self.boxes[idx]
+            if box.left <= x <= box.left + box.box_width and box.top <= y < box.top + box.box_height:
+                if found is None or idx > found:
+                    found = idx
+        return None if found is None else self.boxes[found]
+
+
+def _edge_geometry(src: BoxSpec, dest: BoxSpec)->tuple:
+    '''
+    return (side, row of horizontal leg, its end on the source box,
+    dest column, dest row, first row of vertical leg) of an edge,
+    as drawn by `draw.draw_edge_at`
+    '''
+    dest_x = dest.left + dest.box_width // 2
+    row = src.top + src.box_height // 2
+    if src.left > dest_x:
+        return _LEFT, row, src.left, dest_x, dest.top, row + 1
+    if src.left + src.box_width < dest_x:
+        return _RIGHT, row, src.left + src.box_width, dest_x, dest.top, row + 1
+    # including the bottom protrusion
+    return _BOTTOM, row, None, dest_x, dest.top, src.top + src.box_height - 1
+
+
+def _draw_edge_clipped(screen: '_Window', src: BoxSpec, dest: BoxSpec, charset):
+    '''
+    draw the part of an edge in `screen`; same as `draw.draw_edge_at`
+    '''
+    side, row, anchor, dest_x, dest_y, leg_top = _edge_geometry(src, dest)
+    if side == _LEFT:
+        screen.hline(row, dest_x, anchor, charset.top_left, charset.xside, charset.left_out)
+        screen.vline(dest_x, leg_top, dest_y, charset.yside)
+    elif side == _RIGHT:
+        screen.hline(row, anchor, dest_x, charset.right_out, charset.xside, charset.top_right)
+        screen.vline(dest_x, leg_top, dest_y, charset.yside)
+    else:
+        screen.vline(dest_x, leg_top + 1, dest_y, charset.yside)
+        screen[leg_top][dest_x] = charset.bottom_out
+    screen[dest_y][dest_x] = charset.top_out
+
+
+class _Window:
+    '''
+    screen-like view over a rectangle of the canvas, at `left`, `top`;
+    writes outside it are dropped
+    '''
+    def __init__(self, rows: List[List[str]], left: int, top: int):
+        self.rows = rows
+        self.left = left
+        self.top = top
+        self.width = len(rows[0])
+        self.outside = _WindowRow([], left)
+
+    def __getitem__(self, row_idx: int)->'_WindowRow':
+        row_idx -= self.top
+        if 0 <= row_idx < len(self.rows):
+            return _WindowRow(self.rows[row_idx], self.left)
+        return self.outside
+
+    def hline(self, row_idx: int, start: int, end: int, first: str, char: str, last: str):
+        '''
+        draw run from column `start` to `end` (inclusive) on row `row_idx`,
+        with `first` and `last` at the ends; only the visible part is built
+        '''
+        row_idx -= self.top
+        if not 0 <= row_idx < len(self.rows):
+            return
+        lo, hi = max(start, self.left), min(end, self.left + self.width - 1)
+        if lo > hi:
+            return
+        run = [char]*(hi - lo + 1)
+        if lo == start:
+            run[0] = first
+        if hi == end:
+            run[-1] = last
+        self.rows[row_idx][lo - self.left:hi - self.left + 1] = run
+
+    def vline(self, col: int, top: int, bottom: int, char: str):
+        '''
+        draw run of `char` in column `col`, from row `top`
+        (inclusive) to `bottom` (exclusive)
+        '''
+        col -= self.left
+        if not 0 <= col < self.width:
+            return
+        for row_idx in range(max(top - self.top, 0), min(bottom - self.top, len(self.rows))):
+            self.rows[row_idx][col] = char
+
+
+class _WindowRow:
+    '''
+    row of a `_Window`; item and slice writes are shifted by `left` and clipped
+    '''
+    __slots__ = ('row', 'left')
+
+    def __init__(self, row: List[str], left: int):
+        self.row = row
+        self.left = left
+
+    def __setitem__(self, key, val):
+        if isinstance(key, slice):
+            # slices are written with as many values as they span
+            start = key.start - self.left
+            lo, hi = max(-start, 0), min(len(val), len(self.row) - start)
+            if lo < hi:
+                self.row[start + lo:start + hi] = val[lo:hi]
+        else:
+            col = key - self.left
+            if 0 <= col < len(self.row):
+                self.row[col] = val
@@ -0,0 +1,50 @@
+'''
+Compare drawing pages with the list canvas (`draw.iter_rows`) and the
+numpy canvas (`numpy_canvas.render_rows`) on the benchmark trees,
+at the default screen width and with pages that aren't split.
+Requires numpy.
+
+    python benchmarks/bench_canvas.py
+'''
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ascii_tree.ascii_tree import layout_pages, flatten_page
+from ascii_tree.draw import iter_rows
+from ascii_tree.numpy_canvas import render_rows
+from ascii_tree.params import SCREEN_WIDTH
+from bench_suite import WORKLOADS, make_tree
+
+# wide enough that no benchmark tree is split
+UNSPLIT_WIDTH = 10**7
+
+
+def timed(func, pages, width):
+    start = time.perf_counter()
+    rows = [func(boxes, edges, width) for boxes, edges in pages]
+    return rows, time.perf_counter() - start
+
+
+def draw_list(boxes, edges, width):
+    return list(iter_rows(boxes, edges, width))
+
+
+def main(seed=0):
+    print(f'{"workload":<12} {"width":>8} {"pages":>6} {"list(s)":>8} {"numpy(s)":>9} {"speedup":>8}')
+    for workload in WORKLOADS:
+        for width in (SCREEN_WIDTH, UNSPLIT_WIDTH):
+            pages = [flatten_page(page) for page in layout_pages(make_tree(workload, seed), width)]
+            # page width is at least the screen width
+            page_width = min(width, max(box.left + box.box_width for boxes, _ in pages for box in boxes) + 1)
+            rows, elapsed = timed(draw_list, pages, page_width)
+            numpy_rows, numpy_elapsed = timed(render_rows, pages, page_width)
+            assert rows == numpy_rows, workload
+            print(f'{workload:<12} {width:>8} {len(pages):>6} {elapsed:>8.3f} {numpy_elapsed:>9.3f} '
+                  f'{elapsed / numpy_elapsed:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
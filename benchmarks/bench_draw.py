@@ -0,0 +1,161 @@
+'''
+Benchmark box and edge rasterization on wide trees.
+
+Compares the span-based `draw_node`/`draw_edge_at` with the
+original cell-by-cell rasterizer (kept below for reference) and
+checks both produce identical screens.
+
+    python benchmarks/bench_draw.py
+'''
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ascii_tree import charsets
+from ascii_tree.ascii_tree import layout_pages, flatten_page
+from ascii_tree.custom_types import Node
+from ascii_tree.draw import draw_boxes, draw_node, draw_edge_at, page_height
+
+
+def cellwise_draw_node(screen, text, left_bound, top_bound, box_width, line_width, padding, charset):
+    '''
+    original rasterizer; writes one cell at a time
+    '''
+    right_bound = left_bound + box_width
+    for i in range(left_bound+1, right_bound):
+        screen[top_bound][i] = charset.top
+    screen[top_bound][left_bound] = charset.top_left
+    screen[top_bound][right_bound] = charset.top_right
+    row_idx = top_bound + 1
+    for p in range(padding):
+        for i in range(left_bound, right_bound+1):
+            if i == left_bound:
+                screen[row_idx + p][i] = charset.left
+            elif i == right_bound:
+                screen[row_idx + p][i] = charset.right
+    row_idx += padding
+    idx = 0
+    while idx < len(text):
+        screen[row_idx][left_bound] = charset.left
+        for i in range(padding):
+            screen[row_idx][left_bound + i + 1] = ' '
+        subtext = text[idx:idx + line_width]
+        text_lbound = left_bound + padding + 1
+        screen[row_idx][text_lbound: text_lbound+len(subtext)] = subtext
+        for i in range(padding):
+            screen[row_idx][right_bound - i - 1] = ' '
+        screen[row_idx][right_bound] = charset.right
+        idx += line_width
+        row_idx += 1
+    for p in range(padding):
+        for i in range(left_bound, right_bound+1):
+            if i == left_bound:
+                screen[row_idx + p][i] = charset.left
+            elif i == right_bound:
+                screen[row_idx + p][i] = charset.right
+    row_idx += padding
+    bottom_bound = row_idx
+    screen[bottom_bound][left_bound] = charset.bottom_left
+    screen[bottom_bound][right_bound] = charset.bottom_right
+    for i in range(left_bound+1, right_bound):
+        screen[bottom_bound][i] = charset.bottom
+
+
+def cellwise_draw_edge(screen, src_left, src_top, src_width, src_height, dest_left, dest_top, dest_width, charset):
+    '''
+    original rasterizer; writes one cell at a time
+    '''
+    dest_x = dest_left + dest_width // 2
+    dest_y = dest_top
+    src_lbound = src_left
+    src_rbound = src_left + src_width
+    src_ymiddle = src_top + src_height // 2
+    if src_lbound > dest_x:
+        for i in range(src_lbound, dest_x-1, -1):
+            screen[src_ymiddle][i] = charset.xside
+        screen[src_ymiddle][src_lbound] = charset.left_out
+        screen[src_ymiddle][dest_x] = charset.top_left
+        for i in range(src_ymiddle+1, dest_y):
+            screen[i][dest_x] = charset.yside
+    elif src_rbound < dest_x:
+        for i in range(src_rbound, dest_x+1):
+            screen[src_ymiddle][i] = charset.xside
+        screen[src_ymiddle][src_rbound] = charset.right_out
+        screen[src_ymiddle][dest_x] = charset.top_right
+        for i in range(src_ymiddle+1, dest_y):
+            screen[i][dest_x] = charset.yside
+    else:
+        src_ybottom = src_height + src_top
+        for i in range(src_ybottom, dest_y):
+            screen[i][dest_x] = charset.yside
+        screen[src_ybottom-1][dest_x] = charset.bottom_out
+    screen[dest_y][dest_x] = charset.top_out
+
+
+def cellwise_draw_boxes(screen, boxes, edges, padding, charset):
+    for box in boxes:
+        cellwise_draw_node(screen, box.text, box.left, box.top, box.box_width, box.line_width, padding, charset)
+    for src, dest in edges:
+        src, dest = boxes[src], boxes[dest]
+        cellwise_draw_edge(screen, src.left, src.top, src.box_width, src.box_height,
+                           dest.left, dest.top, dest.box_width, charset)
+
+
+def wide_tree(fanout, box_max_width, depth=2):
+    '''
+    tree where each node has `fanout` children with
+    labels long enough to be wrapped
+    '''
+    label = 'lorem ipsum dolor sit amet ' * (box_max_width // 10 + 1)
+    root = Node.init_with_box(label, box_max_width=box_max_width)
+    level = [root]
+    for _ in range(depth):
+        next_level = []
+        for parent in level:
+            for i in range(fanout):
+                child = Node.init_with_box(f'{i} {label}', box_max_width=box_max_width)
+                parent.children.append(child)
+                next_level.append(child)
+        level = next_level
+    return root
+
+
+def bench(fanout, box_max_width, charset, repeat=5):
+    root = wide_tree(fanout, box_max_width)
+    # one page, as wide as it needs to be
+    page, = layout_pages(root, screen_width=10**9)
+    boxes, edges = flatten_page(page)
+    width = max(box.left + box.box_width for box in boxes) + 1
+    height = page_height(boxes)
+
+    def render(draw_func):
+        screen = [[' ']*width for _ in range(height)]
+        draw_func(screen, boxes, edges, 1, charset)
+        return screen
+
+    def timed(draw_func):
+        # time drawing only, not screen allocation
+        best = float('inf')
+        for _ in range(repeat):
+            screen = [[' ']*width for _ in range(height)]
+            start = time.perf_counter()
+            draw_func(screen, boxes, edges, 1, charset)
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    assert render(draw_boxes) == render(cellwise_draw_boxes), 'outputs differ'
+    return len(boxes), timed(cellwise_draw_boxes), timed(draw_boxes)
+
+
+def main():
+    print(f'{"charset":>8} {"box_max_width":>14} {"boxes":>6} {"cellwise(s)":>12} {"spans(s)":>10} {"speedup":>8}')
+    for charset in (charsets.Ascii, charsets.Unicode):
+        for box_max_width in (30, 45, 60, 90, 120):
+            nboxes, cell, span = bench(fanout=12, box_max_width=box_max_width, charset=charset)
+            print(f'{charset.name:>8} {box_max_width:>14} {nboxes:>6} {cell:>12.4f} {span:>10.4f} {cell/span:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+'''
+Benchmark rendering a tree of ~500 pages on 1 to N worker processes.
+
+Checks the parallel output is identical to the serial output.
+
+    python benchmarks/bench_parallel.py [max_workers]
+'''
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ascii_tree.ascii_tree import iter_lines, layout_pages, flatten_page
+from ascii_tree.custom_types import Node
+from ascii_tree.draw import iter_rows
+from ascii_tree.parallel import render_pages
+
+SCREEN_WIDTH = 180
+
+
+def paged_tree(pages):
+    '''
+    root with wide subtrees, each wide enough to fill about a page
+    '''
+    root = Node.init_with_box('root')
+    for i in range(pages):
+        child = Node.init_with_box(f'subtree {i}')
+        for j in range(5):
+            grandchild = Node.init_with_box(f'node {i}.{j} with a label long enough to wrap')
+            grandchild.children.extend(Node.init_with_box(f'leaf {i}.{j}.{k}') for k in range(2))
+            child.children.append(grandchild)
+        root.children.append(child)
+    return root
+
+
+def bench(pages, workers, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = list(render_pages(pages, SCREEN_WIDTH, workers=workers))
+        best = min(best, time.perf_counter() - start)
+    return rows, best
+
+
+def main():
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() or 1
+    pages = [flatten_page(page) for page in layout_pages(paged_tree(250), SCREEN_WIDTH)]
+    print(f'pages: {len(pages)}, cores: {os.cpu_count()}')
+
+    expected = [list(iter_rows(boxes, edges, SCREEN_WIDTH)) for boxes, edges in pages]
+    print(f'{"workers":>8} {"time(s)":>9} {"speedup":>8}')
+    serial = None
+    for workers in range(1, max_workers + 1):
+        rows, elapsed = bench(pages, workers)
+        assert rows == expected, f'output differs with {workers} workers'
+        serial = serial or elapsed
+        print(f'{workers:>8} {elapsed:>9.3f} {serial / elapsed:>8.2f}')
+
+    # end-to-end, including layout
+    root = paged_tree(250)
+    assert list(iter_lines(root, SCREEN_WIDTH, workers=max_workers)) == list(iter_lines(root, SCREEN_WIDTH))
+
+
+if __name__ == '__main__':
+    main()
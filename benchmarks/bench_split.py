@@ -0,0 +1,53 @@
+'''
+Benchmark splitting very wide trees into pages.
+
+Time of `split_tree` should grow linearly with fan-out,
+i.e. time per child should stay roughly constant.
+
+    python benchmarks/bench_split.py
+'''
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ascii_tree.ascii_tree import get_node_widths, split_tree, update_page_nums
+from ascii_tree.custom_types import Node
+
+
+def fanout_tree(fanout):
+    '''
+    directory-listing like tree: root with `fanout` children,
+    every tenth child has a few children of its own
+    '''
+    root = Node.init_with_box('/var/log')
+    for i in range(fanout):
+        child = Node.init_with_box(f'file-{i}.log')
+        if i % 10 == 0:
+            child.children.extend(Node.init_with_box(f'file-{i}.log.{j}.gz') for j in range(3))
+        root.children.append(child)
+    return root
+
+
+def bench(fanout, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        root = fanout_tree(fanout)
+        get_node_widths(root)
+        start = time.perf_counter()
+        splits, page_map = split_tree(root)
+        update_page_nums(page_map, splits)
+        best = min(best, time.perf_counter() - start)
+    return len(splits), best
+
+
+def main():
+    print(f'{"fanout":>8} {"pages":>7} {"time(s)":>9} {"us/child":>9}')
+    for fanout in (10, 100, 1000, 10000, 100000):
+        pages, elapsed = bench(fanout)
+        print(f'{fanout:>8} {pages:>7} {elapsed:>9.4f} {elapsed / fanout * 1e6:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
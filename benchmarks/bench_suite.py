@@ -0,0 +1,268 @@
+'''
+Benchmark suite for the layout, pagination and drawing hot paths.
+
+Trees are generated from a seed, so runs are reproducible. Each phase,
+i.e. `get_node_widths`, `position_nodes`, `split_tree`, `draw` and
+`print_tree`, is timed separately (best of `--repeat`) and its peak
+memory is measured with tracemalloc in a separate, untimed run.
+A hash of the printed output of each workload is recorded, so
+optimizations can be checked to not change the output.
+
+    python benchmarks/bench_suite.py                      # print results
+    python benchmarks/bench_suite.py -o before.json       # save results
+    python benchmarks/bench_suite.py --compare before.json
+
+With `--compare`, timings are shown relative to a previous run and
+the exit status is 1 if the output of any workload changed.
+'''
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ascii_tree.ascii_tree import get_node_widths, position_nodes, split_tree, update_page_nums, \
+    layout_pages, flatten_page, print_tree
+from ascii_tree.custom_types import Node, clear_box_cache
+from ascii_tree.draw import draw_boxes, page_height, page_width
+from ascii_tree.params import SCREEN_WIDTH
+
+WORDS = ['alpha', 'beta', 'gamma', 'delta', 'epsilon', 'zeta', 'eta', 'theta', 'iota', 'kappa']
+
+
+def balanced_tree(rng, depth=6, fanout=4):
+    root = Node.init_with_box('root')
+    level = [root]
+    for d in range(depth):
+        next_level = []
+        for node in level:
+            for i in range(fanout):
+                child = Node.init_with_box(f'{rng.choice(WORDS)} {d}.{i}')
+                node.children.append(child)
+                next_level.append(child)
+        level = next_level
+    return root
+
+
+def chain_tree(rng, length=3000):
+    root = node = Node.init_with_box('root')
+    for i in range(length):
+        child = Node.init_with_box(f'{rng.choice(WORDS)} {i}')
+        node.children.append(child)
+        node = child
+    return root
+
+
+def fanout_tree(rng, fanout=20000):
+    root = Node.init_with_box('root')
+    root.children.extend(Node.init_with_box(f'{rng.choice(WORDS)} {i}') for i in range(fanout))
+    return root
+
+
+def long_label_tree(rng, count=2000):
+    '''
+    labels that wrap onto many lines, under a few parents
+    '''
+    root = Node.init_with_box('root')
+    parents = [Node.init_with_box(f'group {i}') for i in range(20)]
+    root.children.extend(parents)
+    for i in range(count):
+        label = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(10, 60)))
+        rng.choice(parents).children.append(Node.init_with_box(f'{i}: {label}'))
+    return root
+
+
+def random_tree(rng, count=20000):
+    '''
+    each node is attached to a random earlier node,
+    biased towards recent ones so the tree has some depth
+    '''
+    nodes = [Node.init_with_box('root')]
+    for i in range(count):
+        parent = rng.choice(nodes[-10:] if rng.random() < 0.5 else nodes)
+        child = Node.init_with_box(f'{rng.choice(WORDS)} {i}')
+        parent.children.append(child)
+        nodes.append(child)
+    return nodes[0]
+
+
+WORKLOADS = {
+    'balanced': balanced_tree,
+    'chain': chain_tree,
+    'fanout': fanout_tree,
+    'long_labels': long_label_tree,
+    'random': random_tree,
+}
+
+
+def make_tree(workload, seed):
+    return WORKLOADS[workload](random.Random(seed))
+
+
+def phase_get_node_widths(workload, seed):
+    root = make_tree(workload, seed)
+    return lambda: get_node_widths(root)
+
+
+def phase_position_nodes(workload, seed):
+    root = make_tree(workload, seed)
+    get_node_widths(root)
+    return lambda: position_nodes(root, 0, 0)
+
+
+def phase_split_tree(workload, seed):
+    root = make_tree(workload, seed)
+    get_node_widths(root)
+
+    def run():
+        if root.box.tree_width > SCREEN_WIDTH:
+            splits, page_map = split_tree(root, max_width=SCREEN_WIDTH)
+            update_page_nums(page_map, splits)
+    return run
+
+
+def phase_draw(workload, seed):
+    pages = [flatten_page(page) for page in layout_pages(make_tree(workload, seed), SCREEN_WIDTH)]
+
+    def run():
+        for boxes, edges in pages:
+            width = max(SCREEN_WIDTH, page_width(boxes))
+            screen = [[' ']*width for _ in range(page_height(boxes))]
+            draw_boxes(screen, boxes, edges)
+    return run
+
+
+def render(workload, seed)->str:
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        print_tree(make_tree(workload, seed), SCREEN_WIDTH)
+    return out.getvalue()
+
+
+def phase_print_tree(workload, seed):
+    return lambda: render(workload, seed)
+
+
+# each phase returns the callable to measure, after doing its setup
+PHASES = {
+    'get_node_widths': phase_get_node_widths,
+    'position_nodes': phase_position_nodes,
+    'split_tree': phase_split_tree,
+    'draw': phase_draw,
+    'print_tree': phase_print_tree,
+}
+
+
+def measure(phase, workload, seed, repeat):
+    '''
+    return best time and peak memory (bytes) of phase.
+    setup is fresh for every run, since some phases modify the tree
+    '''
+    best = float('inf')
+    for _ in range(repeat):
+        clear_box_cache()
+        run = PHASES[phase](workload, seed)
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+
+    clear_box_cache()
+    run = PHASES[phase](workload, seed)
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_suite(workloads, phases, seed, repeat):
+    results = {}
+    for workload in workloads:
+        output = render(workload, seed)
+        results[workload] = {
+            'output_sha1': hashlib.sha1(output.encode()).hexdigest(),
+            'output_lines': output.count('\n'),
+            'phases': {},
+        }
+        for phase in phases:
+            elapsed, peak = measure(phase, workload, seed, repeat)
+            results[workload]['phases'][phase] = {'time': elapsed, 'peak_bytes': peak}
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': seed,
+            'repeat': repeat,
+            'screen_width': SCREEN_WIDTH,
+        },
+        'results': results,
+    }
+
+
+def report(suite, baseline=None)->bool:
+    '''
+    print results, relative to baseline if given.
+    Returns False if output of a workload differs from baseline
+    '''
+    same_output = True
+    header = f'{"workload":<12} {"phase":<16} {"time(s)":>9} {"peak(KiB)":>10}'
+    print(header + (f' {"vs base":>8}' if baseline else ''))
+    for workload, result in suite['results'].items():
+        base = baseline['results'].get(workload) if baseline else None
+        for phase, stats in result['phases'].items():
+            line = f'{workload:<12} {phase:<16} {stats["time"]:>9.4f} {stats["peak_bytes"] / 1024:>10.0f}'
+            if base and phase in base['phases']:
+                line += f' {stats["time"] / base["phases"][phase]["time"]:>7.2f}x'
+            print(line)
+        if base and base['output_sha1'] != result['output_sha1']:
+            print(f'{workload}: OUTPUT CHANGED')
+            same_output = False
+    return same_output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workloads', nargs='+', choices=list(WORKLOADS), default=list(WORKLOADS))
+    parser.add_argument('--phases', nargs='+', choices=list(PHASES), default=list(PHASES))
+    parser.add_argument('-o', '--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', help='JSON results of a previous run')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fp:
+            baseline = json.load(fp)
+        # outputs are only comparable for the same trees
+        args.seed = baseline['meta']['seed']
+
+    suite = run_suite(args.workloads, args.phases, args.seed, args.repeat)
+    same_output = report(suite, baseline)
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(suite, fp, indent=2)
+    if not same_output:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+'''
+Compare the tidy layout with the default boxed layout on the
+benchmark trees: width and height of the whole tree, number of pages
+at the default screen width, and layout time.
+
+    python benchmarks/bench_tidy.py
+'''
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ascii_tree.ascii_tree import get_node_widths, position_nodes, layout_pages, preorder
+from ascii_tree.custom_types import clear_box_cache
+from ascii_tree.params import SCREEN_WIDTH
+from ascii_tree.tidy import tidy_layout
+from bench_suite import WORKLOADS, make_tree
+
+
+def tree_height(root):
+    return max(node.box.position.top + node.box.box_height for node in preorder(root))
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main(seed=0):
+    print(f'{"workload":<12} {"width":>8} {"tidy":>8} {"saved":>6} {"height":>7} {"tidy":>7} '
+          f'{"pages":>6} {"tidy":>6} {"avoided":>8} {"time(s)":>8} {"tidy":>8}')
+    for workload in WORKLOADS:
+        clear_box_cache()
+        root = make_tree(workload, seed)
+        width, elapsed = timed(get_node_widths, root)
+        position_nodes(root, 0, 0)
+        height = tree_height(root)
+
+        root = make_tree(workload, seed)
+        tidy_width, tidy_elapsed = timed(tidy_layout, root)
+        tidy_height = tree_height(root)
+
+        pages = len(layout_pages(make_tree(workload, seed), SCREEN_WIDTH))
+        tidy_pages = len(layout_pages(make_tree(workload, seed), SCREEN_WIDTH, layout='tidy'))
+        print(f'{workload:<12} {width:>8} {tidy_width:>8} {1 - tidy_width / width:>6.0%} {height:>7} '
+              f'{tidy_height:>7} {pages:>6} {tidy_pages:>6} {pages - tidy_pages:>8} {elapsed:>8.4f} '
+              f'{tidy_elapsed:>8.4f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+'''
+Benchmark transforming a DAG with shared subtrees, whose children are
+fetched with a simulated latency, sequentially and level by level.
+
+Checks every path gives the same tree, including "(repeated)" boxes,
+on random DAGs.
+
+    python benchmarks/bench_transform.py [fetch_workers]
+'''
+import sys
+import os
+import random
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ascii_tree.ascii_tree import iter_lines
+from ascii_tree.external import transformed_tree
+
+SCREEN_WIDTH = 180
+# seconds per call of get_children
+LATENCY = 0.0005
+
+
+def random_dag(seed, size):
+    '''
+    return children of each node of a random DAG, by node index
+    '''
+    rand = random.Random(seed)
+    return {idx: sorted(rand.sample(range(idx + 1, size), min(size - idx - 1, rand.randint(0, 4))))
+            for idx in range(size)}
+
+
+def render(dag, **kwargs):
+    troot = transformed_tree(0, str, dag.__getitem__, share_key=int, **kwargs)
+    return list(iter_lines(troot, SCREEN_WIDTH))
+
+
+def check(seeds=200):
+    for seed in range(seeds):
+        dag = random_dag(seed, random.Random(seed).randint(2, 40))
+        for limits in (dict(max_repeats=1), dict(max_repeats=2, max_depth=3), dict(max_repeats=1, max_children=2)):
+            expected = render(dag, **limits)
+            for fetch in (dict(fetch_workers=1), dict(fetch_workers=4),
+                          dict(get_children_many=lambda sources: [dag[source] for source in sources])):
+                assert render(dag, **limits, **fetch) == expected, f'output differs: seed {seed}, {limits}, {fetch}'
+
+
+def bench(dag, fetch_workers):
+    def get_children(node):
+        time.sleep(LATENCY)
+        return dag[node]
+    start = time.perf_counter()
+    troot = transformed_tree(0, str, get_children, share_key=int, max_repeats=3, fetch_workers=fetch_workers)
+    return troot, time.perf_counter() - start
+
+
+def main():
+    fetch_workers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    check()
+    dag = random_dag(0, 2000)
+    _, serial = bench(dag, None)
+    _, threaded = bench(dag, fetch_workers)
+    print(f'nodes: {len(dag)}, fetch_workers: {fetch_workers}')
+    print(f'sequential {serial:.3f}s, level by level {threaded:.3f}s, speedup {serial / threaded:.2f}')
+
+
+if __name__ == '__main__':
+    main()
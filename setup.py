@@ -5,5 +5,7 @@ setup(name='ascii_tree',
       version='0.1',
       description='create beautiful ascii trees',
       python_requires='>=3',
-      packages=find_packages()
+      packages=find_packages(),
+      # for the `canvas='numpy'` backend
+      extras_require={'numpy': ['numpy']}
 )